@@ -2,9 +2,16 @@ from typing import Callable, List, Optional, Tuple
 
 from crewai import Agent
 from crewai.agent import AgentAction
+from langchain_core.agents import AgentFinish
 
-from techsage.agent_core.llm import llm
-from techsage.agent_core.tools import google_search_tool, scrap_website_tool
+from techsage.agent_core.context import current_deadline
+from techsage.agent_core.llm import get_llm
+from techsage.agent_core.tools import google_search_tool, knowledge_base_tool, scrap_website_tool
+
+WRAP_UP_NOTE = (
+    "The time for this task is over. Do not use any tool anymore and give your final answer now, "
+    "based on the information gathered so far."
+)
 
 
 class TechSageAgents:
@@ -16,6 +23,7 @@ class TechSageAgents:
         :param Optional[Callable] add_to_chat: A method allowing to send message into the app chat
         """
         self.add_to_chat = add_to_chat
+        self.llm = get_llm()
 
     def _step_call_back(self, actions: List[Tuple], agent_name: str, avatar: str) -> None:
         """A method called after each step for logging purposes.
@@ -23,12 +31,20 @@ class TechSageAgents:
         :param List[Tuple] actions: The actions output of the step.
         :param str agent_name: The name of the agent performing this step.
         :param str avatar: The avatar to use in the chat.
+        :raises DeadlineExceeded: If the time budget of the run is exhausted before the agent finishes.
         """
-        if not self.add_to_chat:
-            return
-
-        msg = [self._format_action(a) for a in actions]
-        self.add_to_chat("\n\n".join(msg), agent_name, avatar)
+        if self.add_to_chat:
+            msg = [self._format_action(a) for a in actions]
+            self.add_to_chat("\n\n".join(msg), agent_name, avatar)
+
+        deadline = current_deadline()
+        if deadline and not isinstance(actions, AgentFinish):
+            deadline.check(overall=True)
+            if deadline.expired:
+                # the phase is over: the agent answers with what it has so the run moves to the next phase,
+                # the observations are shared with the executor and given to the llm in the next step
+                for i, (action, observation) in enumerate(actions):
+                    actions[i] = (action, f"{observation}\n\n{WRAP_UP_NOTE}")
 
     def _format_action(self, action: Tuple) -> str:
         """Format a single action into a string message.
@@ -76,9 +92,9 @@ class TechSageAgents:
             """,
             cache=True,
             verbose=1,
-            tools=[google_search_tool],
+            tools=[knowledge_base_tool, google_search_tool],
             allow_delegation=False,
-            llm=llm,
+            llm=self.llm,
             step_callback=lambda x: self._step_call_back(x, role, avatar),
         )
 
@@ -99,7 +115,7 @@ class TechSageAgents:
             verbose=1,
             tools=[scrap_website_tool],
             allow_delegation=False,
-            llm=llm,
+            llm=self.llm,
             step_callback=lambda x: self._step_call_back(x, role, avatar),
         )
 
@@ -118,8 +134,8 @@ class TechSageAgents:
             """,
             cache=True,
             verbose=1,
-            tools=[],
+            tools=[knowledge_base_tool],
             allow_delegation=False,
-            llm=llm,
+            llm=self.llm,
             step_callback=lambda x: self._step_call_back(x, role, avatar),
         )
@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Set, Type
+
+from pydantic import BaseModel
+
+from techsage.agent_core.prefetch import Prefetcher
+from techsage.agent_core.schemas import ScrapeResults, parse_output
+from techsage.utils.deadline import Deadline
+from techsage.utils.topic_state import TopicState
+from techsage.utils.urls import canonicalize_url
+
+
+class RunContext:
+    """State of a crew run, shared with the tools called during the run"""
+
+    def __init__(
+        self,
+        topic: str,
+        topic_state: Optional[TopicState] = None,
+        deadline: Optional[Deadline] = None,
+        priority: str = "interactive",
+    ) -> None:
+        """Initialize the run context
+
+        :param str topic: The topic of the run
+        :param Optional[TopicState] topic_state: The state of the previous runs in incremental mode, default None
+        :param Optional[Deadline] deadline: The time budget of the run, default None
+        :param str priority: The priority of the LLM requests of the run, see LLM_PRIORITIES, default interactive
+        """
+        self.topic = topic
+        self.topic_state = topic_state
+        self.deadline = deadline
+        self.priority = priority
+        self.prefetcher: Optional[Prefetcher] = None
+        self.content_hashes: Dict[str, str] = {}
+        self.scraped_urls: Set[str] = set()
+        self.unchanged_urls: Set[str] = set()
+        self.sources: Dict[str, str] = {}
+        self.task_outputs: Dict[str, str] = {}
+        self.structured_outputs: Dict[str, BaseModel] = {}
+
+    def add_source(self, url: str, text: str) -> None:
+        """Keep the content of a scraped page, used to build a partial report if the budget runs out
+
+        :param str url: The canonical url of the page
+        :param str text: The text content of the page
+        """
+        self.sources[url] = text
+
+    def on_task_done(
+        self,
+        name: str,
+        output: object,
+        next_phase: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None,
+    ) -> None:
+        """Record the output of a finished task and enter the next phase of the run
+
+        A structured output is validated and its raw text replaced by compact JSON, which is what the next
+        tasks receive as context. The scraped sources unchanged since the previous run are dropped from it.
+
+        :param str name: The name of the task
+        :param object output: The output of the task
+        :param Optional[str] next_phase: The phase starting after the task, default None
+        :param Optional[Type[BaseModel]] schema: The schema of the output, default None for free text
+        """
+        raw_output = str(getattr(output, "raw_output", output))
+        parsed = None
+        if schema:
+            parsed = parse_output(schema, getattr(output, "exported_output", None)) or parse_output(schema, raw_output)
+        if isinstance(parsed, ScrapeResults):
+            parsed.sources = [s for s in parsed.sources if canonicalize_url(s.url) not in self.unchanged_urls]
+        if parsed is not None:
+            self.structured_outputs[name] = parsed
+            raw_output = parsed.model_dump_json()
+            if hasattr(output, "raw_output"):
+                output.raw_output = raw_output
+        self.task_outputs[name] = raw_output
+        if self.deadline and next_phase:
+            self.deadline.start_phase(next_phase)
+
+    def mark_scraped(self, url: str) -> bool:
+        """Record that an url is scraped during the run
+
+        :param str url: The canonical url
+        :return bool: False if the url was already scraped during the run
+        """
+        if url in self.scraped_urls:
+            return False
+        self.scraped_urls.add(url)
+        return True
+
+    def is_unchanged(self, url: str, content_hash: str) -> bool:
+        """Record the hash of a scraped page and check if it changed since the previous run
+
+        :param str url: The canonical url of the page
+        :param str content_hash: The hash of the page content
+        :return bool: True if the page was already processed with the same content during the previous run
+        """
+        self.content_hashes[url] = content_hash
+        unchanged = self.topic_state is not None and self.topic_state.pages.get(url) == content_hash
+        if unchanged:
+            self.unchanged_urls.add(url)
+        return unchanged
+
+
+_current_run: ContextVar[Optional[RunContext]] = ContextVar("current_run", default=None)
+
+
+def get_current_run() -> Optional[RunContext]:
+    """Get the context of the run in progress
+
+    :return Optional[RunContext]: The context, None if no run is in progress
+    """
+    return _current_run.get()
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Get the time budget of the run in progress
+
+    :return Optional[Deadline]: The deadline, None if no run is in progress or if it has no time budget
+    """
+    run = _current_run.get()
+    return run.deadline if run else None
+
+
+@contextmanager
+def run_context(context: RunContext) -> Iterator[RunContext]:
+    """Make a run context available to the tools for the duration of the block
+
+    :param RunContext context: The context of the run
+    :yield RunContext: The same context
+    """
+    token = _current_run.set(context)
+    try:
+        yield context
+    finally:
+        _current_run.reset(token)
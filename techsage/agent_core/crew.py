@@ -1,24 +1,58 @@
 import os
+from datetime import datetime
+from textwrap import dedent
 from typing import Callable, Dict, Optional
 
 from crewai import Agent, Crew, Process, Task
 
 from techsage.agent_core.agents import TechSageAgents
-from techsage.agent_core.llm import llm
+from techsage.agent_core.context import RunContext, run_context
+from techsage.agent_core.llm import get_llm
+from techsage.agent_core.prefetch import Prefetcher
+from techsage.agent_core.schemas import ScrapeResults, SearchResult, SearchResults
+from techsage.agent_core.source_selection import SourceSelector
 from techsage.agent_core.tasks import TechSageTasks
+from techsage.agent_core.tools import prefetch_urls, scrape_page, search_web
+from techsage.utils.constants import DEADLINE_CONFIG, PREFETCH_CONFIG
+from techsage.utils.deadline import Deadline
+from techsage.utils.report_store import get_report_store
+from techsage.utils.topic_state import TopicState
 
 
 class TechSageCrew:
     """Definition of the crew"""
 
-    def __init__(self, topic: str, add_to_chat: Optional[Callable] = None) -> None:
+    def __init__(
+        self,
+        topic: str,
+        add_to_chat: Optional[Callable] = None,
+        incremental: bool = False,
+        reuse_recent: bool = True,
+        deadline: Optional[float] = None,
+        priority: str = "interactive",
+        fast_search: bool = False,
+    ) -> None:
         """Initialize the crew
 
         :param str topic: The topic on which the crew should work
         :param Optional[Callable] add_to_chat: A method allowing to send message into the app chat, default None
+        :param bool incremental: If True only report what is new since the previous run on the topic, default False
+        :param bool reuse_recent: If True a recent report on the same topic is returned without running the crew,
+        default True
+        :param Optional[float] deadline: The time budget of the run in seconds, a partial report is returned when
+        it runs out, default None for no limit
+        :param str priority: The priority of the LLM requests, 'interactive' or 'background', default interactive
+        :param bool fast_search: If True the sources are selected by ranking search results instead of by the
+        searcher agent, default False
         """
         self.topic = topic
         self.add_to_chat = add_to_chat
+        self.incremental = incremental
+        self.reuse_recent = reuse_recent and not incremental
+        self.topic_state = TopicState.load(topic) if incremental else None
+        self.deadline = deadline
+        self.priority = priority
+        self.fast_search = fast_search
 
     def _initialize_agents(self) -> dict:
         """Initialize all the agents
@@ -32,19 +66,113 @@ class TechSageCrew:
             "content_generator": agents.content_generator(),
         }
 
-    def _initialize_tasks(self, agents: Dict[str, Agent]) -> dict:
+    def _initialize_tasks(self, agents: Dict[str, Agent], sources: Optional[SearchResults] = None) -> dict:
         """Initialize all the tasks
 
+        Each task receives the compact JSON output of the previous one as context.
+
         :param Dict[str, Agent] agents: The available agents
+        :param Optional[SearchResults] sources: The already selected sources, the search task is skipped if given,
+        default None
         :return dict: The created tasks
         """
-        tasks = TechSageTasks(self.topic)
+        previous_report = self.topic_state.report if self.topic_state else None
+        tasks = TechSageTasks(self.topic, previous_report=previous_report)
+        search = {} if sources else {"search": tasks.search_task(agents["searcher"])}
+        scrape = tasks.scrape_task(agents["scraper"], sources, context=list(search.values()) or None)
         return {
-            "search": tasks.search_task(agents["searcher"]),
-            "scrape": tasks.scrape_task(agents["scraper"]),
-            "generate_content": tasks.generate_content_task(agents["content_generator"]),
+            **search,
+            "scrape": scrape,
+            "generate_content": tasks.generate_content_task(agents["content_generator"], context=[scrape]),
         }
 
+    def _select_sources(self, run: RunContext) -> Optional[SearchResults]:
+        """Select the sources to scrape without LLM and start fetching them
+
+        :param RunContext run: The context of the run
+        :return Optional[SearchResults]: The selected sources, None if the search failed
+        """
+        if run.deadline:
+            run.deadline.start_phase("search")
+        selected = SourceSelector(search_web).select(self.topic)
+        if not selected:
+            return None
+        sources = SearchResults(urls=[SearchResult(**s) for s in selected])
+        run.prefetcher.prefetch([s.url for s in sources.urls])
+        run.structured_outputs["search"] = sources
+        run.task_outputs["search"] = sources.model_dump_json()
+        if self.add_to_chat:
+            self.add_to_chat("\n".join([f"{s.url}: {s.reason}" for s in sources.urls]), "Source selection", "🧭")
+        return sources
+
+    def _track_phases(self, tasks: Dict[str, Task], run: RunContext) -> None:
+        """Record the output of each task and move the time budget to the next phase when a task is done
+
+        :param Dict[str, Task] tasks: The tasks to do, in execution order
+        :param RunContext run: The context of the run
+        """
+        phases = {"search": "scrape", "scrape": "generate", "generate_content": None}
+        schemas = {"search": SearchResults, "scrape": ScrapeResults}
+        for name, task in tasks.items():
+            task.callback = lambda output, name=name: self._on_task_done(run, name, output, phases, schemas)
+        if run.deadline:
+            run.deadline.start_phase("search" if "search" in tasks else "scrape")
+
+    @staticmethod
+    def _on_task_done(
+        run: RunContext, name: str, output: object, phases: Dict[str, Optional[str]], schemas: Dict[str, type]
+    ) -> None:
+        """Record the output of a finished task and start fetching the urls found by the search
+
+        :param RunContext run: The context of the run
+        :param str name: The name of the task
+        :param object output: The output of the task
+        :param Dict[str, Optional[str]] phases: The phase starting after each task
+        :param Dict[str, type] schemas: The schema of the output of each task
+        """
+        run.on_task_done(name, output, phases.get(name), schemas.get(name))
+        if name == "search" and name in run.structured_outputs:
+            prefetch_urls([s.url for s in run.structured_outputs[name].urls[: PREFETCH_CONFIG["top_results"]]])
+
+    def _build_partial_report(self, run: RunContext, deadline: Deadline) -> str:
+        """Build a report from what was gathered before the time budget ran out
+
+        The gathered content is summarized by the llm within the time kept in reserve at the end of the budget,
+        listed if it could not be summarized in time.
+
+        :param RunContext run: The context of the interrupted run
+        :param Deadline deadline: The whole time budget of the run, reserve included
+        :return str: The partial report
+        """
+        run.deadline = deadline  # the llm requests of the run are bounded by the run budget
+        run.deadline.start_phase("generate")
+        excerpt_size = DEADLINE_CONFIG["excerpt_size"]
+        gathered = "\n\n".join(
+            [f"Source: {url}\n{text[:excerpt_size]}" for url, text in run.sources.items()]
+            + [f"{name} result:\n{output}" for name, output in run.task_outputs.items()]
+        )
+        if gathered and run.deadline.remaining() > 0:
+            try:
+                summary = get_llm().invoke(
+                    dedent(
+                        f"""
+                        Write a short report about {self.topic} using only the gathered content below.
+                        Summarize the key trends and insights and cite the source urls.
+
+                        {gathered}
+                        """
+                    )
+                ).content
+                return f"⏱️ The time budget ran out, this report is based on partial research.\n\n{summary}"
+            except Exception:
+                pass
+        sources = "\n\n".join([f"- {url}: {text[:excerpt_size]}" for url, text in run.sources.items()])
+        outputs = "\n\n".join(run.task_outputs.values())
+        return (
+            f"⏱️ The time budget ran out before the report on {self.topic} was written. "
+            f"Here is what was gathered so far.\n\n{outputs}\n\n{sources or 'No source could be scraped in time.'}"
+        )
+
     def _initialize_and_run_crew(self, tasks: Dict[str, Task], agents: Dict[str, Agent]) -> str:
         """Initialize the crew and kick off
 
@@ -56,10 +184,9 @@ class TechSageCrew:
         crew = Crew(
             agents=list(agents.values()),
             tasks=list(tasks.values()),
-            manager_llm=llm,
+            manager_llm=get_llm(),
             process=Process.sequential,
             cache=True,
-            max_rpm=100,
             memory=is_openai_setup,  # True will improve performance but require OpenAI key
             verbose=1,
         )
@@ -77,7 +204,41 @@ class TechSageCrew:
 
         :return str: The result of the kick off
         """
-        agents = self._initialize_agents()
-        tasks = self._initialize_tasks(agents)
-        result = self._initialize_and_run_crew(tasks, agents)
+        store = get_report_store()
+        recent = store.find_recent(self.topic) if self.reuse_recent else None
+        if recent:
+            if self.add_to_chat:
+                date = datetime.fromtimestamp(recent["created_at"]).strftime("%Y-%m-%d %H:%M")
+                self.add_to_chat(f"Report of {date} on {recent['topic']}:\n\n{recent['report']}", "Reports", "📚")
+            return recent["report"]
+
+        deadline = full_deadline = None
+        if self.deadline:
+            full_deadline = Deadline(self.deadline)
+            # the crew stops early enough to summarize what it gathered if it runs out of time
+            reserve = min(DEADLINE_CONFIG["summary_reserve"], self.deadline * DEADLINE_CONFIG["max_summary_share"])
+            deadline = Deadline(self.deadline - reserve)
+        with run_context(RunContext(self.topic, self.topic_state, deadline, self.priority)) as run:
+            run.prefetcher = Prefetcher(scrape_page, deadline)
+            sources = self._select_sources(run) if self.fast_search else None
+            agents = self._initialize_agents()
+            if sources:
+                del agents["searcher"]
+            tasks = self._initialize_tasks(agents, sources)
+            self._track_phases(tasks, run)
+            try:
+                result = self._initialize_and_run_crew(tasks, agents)
+            except Exception:
+                if not (deadline and deadline.remaining(overall=True) == 0):
+                    raise
+                result = self._build_partial_report(run, full_deadline)
+                if self.add_to_chat:
+                    self.add_to_chat(result, "Partial report", "⏱️")
+                return result
+            finally:
+                run.prefetcher.close()
+        store.save(self.topic, str(result), sorted(run.content_hashes), self.incremental)
+        if self.topic_state:
+            self.topic_state.update(run.content_hashes, str(result))
+            self.topic_state.save()
         return result
@@ -1,11 +1,159 @@
+import hashlib
 import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
+import httpx
+import openai
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
 from langchain_openai.chat_models import ChatOpenAI
 
-params = {
-    "model": os.environ["OPENAI_MODEL_NAME"],
-}
-if os.environ["LOCAL"] == "true":
-    params["base_url"] = os.environ["OPENAI_API_BASE"]
+from techsage.agent_core.context import get_current_run
+from techsage.utils.constants import LLM_CLIENT_CONFIG, LLM_SCHEDULER_CONFIG
+from techsage.utils.deadline import DeadlineExceeded
+from techsage.utils.llm_scheduler import llm_scheduler
 
-llm = ChatOpenAI(**params)
+OVERLOAD_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APITimeoutError)
+
+
+class TechSageChatOpenAI(ChatOpenAI):
+    """ChatOpenAI client sending its requests through the shared LLM scheduler, each one bounded by the
+    time budget of the run in progress"""
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Generate a chat completion, cancelled when the time budget of the run is exhausted
+
+        The openai client does not retry, requests failing on overload or on a connection error are retried here
+        in a new slot so that the scheduler sees every attempt.
+
+        :param List[BaseMessage] messages: The messages of the conversation
+        :param Optional[List[str]] stop: The stop words, default None
+        :param Optional[CallbackManagerForLLMRun] run_manager: The langchain callback manager, default None
+        :raises DeadlineExceeded: If the time budget of the run is exhausted before the request succeeds
+        :return ChatResult: The completion
+        """
+        run = get_current_run()
+        # bounded by the end of the run only: an agent running past its phase is asked to wrap up by the step
+        # callback, cutting its llm request would fail the whole crew
+        deadline = run.deadline.overall() if run and run.deadline else None
+        priority = run.priority if run else "interactive"
+        max_retries = LLM_SCHEDULER_CONFIG["max_retries"]
+        for attempt in range(max_retries + 1):
+            with llm_scheduler.slot(priority, deadline) as slot:
+                cut_by_deadline = False
+                if deadline:
+                    default = self.request_timeout if isinstance(self.request_timeout, (int, float)) else None
+                    kwargs["timeout"] = deadline.timeout(default)
+                    cut_by_deadline = default is None or kwargs["timeout"] < default
+                try:
+                    return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                except openai.APITimeoutError:
+                    # a timeout shortened by the time budget says nothing about the load of the model server
+                    slot.cancelled = cut_by_deadline
+                    slot.overloaded = not cut_by_deadline
+                    if cut_by_deadline or attempt == max_retries:
+                        raise
+                except OVERLOAD_ERRORS:
+                    slot.overloaded = True
+                    if attempt == max_retries:
+                        raise
+                except openai.APIConnectionError:
+                    # the request did not reach the model server, it says nothing about its load
+                    slot.cancelled = True
+                    if attempt == max_retries:
+                        raise
+            delay = random.uniform(  # full jitter
+                0, min(LLM_SCHEDULER_CONFIG["backoff_max"], LLM_SCHEDULER_CONFIG["backoff_base"] * 2**attempt)
+            )
+            if deadline and delay >= deadline.remaining():
+                raise DeadlineExceeded("Not enough time left to retry the LLM request")
+            time.sleep(delay)
+
+
+class LLMRegistry:
+    """Registry of the LLM client of the current configuration, swapped when the fingerprint of the configuration
+    changes so that the next crew picks it up without restarting nor re-importing"""
+
+    def __init__(self, config: Optional[Dict] = None) -> None:
+        """Initialize the registry
+
+        :param Optional[Dict] config: The client configuration, default LLM_CLIENT_CONFIG
+        """
+        self.config = {**LLM_CLIENT_CONFIG, **(config or {})}
+        self._lock = threading.Lock()
+        self._current: Optional[Tuple[str, TechSageChatOpenAI]] = None
+        self._http_client: Optional[httpx.Client] = None
+
+    @staticmethod
+    def _settings() -> Dict[str, Any]:
+        """Read the client settings from the current configuration
+
+        :return Dict[str, Any]: The parameters of the client
+        """
+        params = {"model": os.environ["OPENAI_MODEL_NAME"]}
+        if os.environ["LOCAL"] == "true":
+            params["base_url"] = os.environ["OPENAI_API_BASE"]
+        return params
+
+    @staticmethod
+    def _fingerprint(params: Dict[str, Any]) -> str:
+        """Compute the fingerprint of client settings and of the values the client reads from the environment,
+        without keeping the api key in clear
+
+        :param Dict[str, Any] params: The parameters of the client
+        :return str: The fingerprint
+        """
+        settings = sorted(params.items()) + [
+            ("api_key", os.environ.get("OPENAI_API_KEY")),
+            ("api_base", os.environ.get("OPENAI_API_BASE")),
+        ]
+        return hashlib.sha256(repr(settings).encode()).hexdigest()
+
+    def _pool(self) -> httpx.Client:
+        """Get the HTTP connection pool shared by all the clients, created on first use
+
+        :return httpx.Client: The pooled HTTP client
+        """
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=self.config["max_connections"],
+                    max_keepalive_connections=self.config["max_keepalive_connections"],
+                    keepalive_expiry=self.config["keepalive_expiry"],
+                )
+            )
+        return self._http_client
+
+    def get(self) -> TechSageChatOpenAI:
+        """Get the client of the current configuration, created when the configuration changed
+
+        :return TechSageChatOpenAI: The client
+        """
+        params = self._settings()
+        fingerprint = self._fingerprint(params)
+        with self._lock:
+            if self._current is None or self._current[0] != fingerprint:
+                # the crews running with the previous client keep it, it shares the connection pool
+                self._current = (fingerprint, TechSageChatOpenAI(**params, max_retries=0, http_client=self._pool()))
+            return self._current[1]
+
+
+llm_registry = LLMRegistry()
+
+
+def get_llm() -> TechSageChatOpenAI:
+    """Get the LLM client of the current configuration
+
+    :return TechSageChatOpenAI: The client
+    """
+    return llm_registry.get()
@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from techsage.utils.constants import PREFETCH_CONFIG
+from techsage.utils.deadline import Deadline
+from techsage.utils.urls import canonicalize_url
+
+
+class Prefetcher:
+    """Fetch the search results in the background while the agents think, until the end of the run"""
+
+    def __init__(
+        self,
+        fetch: Callable[[str, Optional[Deadline]], str],
+        deadline: Optional[Deadline] = None,
+        workers: int = PREFETCH_CONFIG["workers"],
+    ) -> None:
+        """Initialize the prefetcher
+
+        :param Callable[[str, Optional[Deadline]], str] fetch: The function fetching and extracting a page
+        :param Optional[Deadline] deadline: The time budget of the run, default None
+        :param int workers: The number of pages fetched at the same time, default from the configuration
+        """
+        self.fetch = fetch
+        self.deadline = deadline.overall() if deadline else None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="techsage-prefetch")
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _fetch(self, url: str) -> Optional[str]:
+        """Fetch a page unless the run is over
+
+        :param str url: The url of the page
+        :return Optional[str]: The text content of the page, None if the prefetcher was closed
+        """
+        if self._closed:
+            return None
+        return self.fetch(url, self.deadline)
+
+    def prefetch(self, urls: List[str]) -> None:
+        """Start fetching pages in the background
+
+        :param List[str] urls: The urls of the pages
+        """
+        with self._lock:
+            if self._closed:
+                return
+            for url in urls:
+                canonical_url = canonicalize_url(url)
+                if canonical_url not in self._futures:
+                    self._futures[canonical_url] = self._executor.submit(self._fetch, url)
+
+    def get(self, canonical_url: str, deadline: Optional[Deadline] = None) -> Optional[str]:
+        """Get the content of a prefetched page, waiting for the fetch if it is still running
+
+        :param str canonical_url: The canonical url of the page
+        :param Optional[Deadline] deadline: The time budget bounding the wait, default None
+        :raises Exception: The error of the prefetch if it failed, the page is not worth fetching again
+        :return Optional[str]: The text content of the page, None if it was not prefetched, was cancelled or is
+        not done before the deadline
+        """
+        with self._lock:
+            future = self._futures.get(canonical_url)
+        if future is None:
+            return None
+        wait([future], timeout=deadline.remaining() if deadline else None)
+        if not future.done() or future.cancelled():
+            return None
+        return future.result()
+
+    def close(self) -> None:
+        """Cancel the prefetches not started yet and stop accepting new ones"""
+        with self._lock:
+            self._closed = True
+            for future in self._futures.values():
+                future.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
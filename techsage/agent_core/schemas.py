@@ -0,0 +1,59 @@
+import re
+from typing import List, Optional, Type, TypeVar
+
+from pydantic import BaseModel, Field, ValidationError
+
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+
+class SearchResult(BaseModel):
+    """A source identified by the search task"""
+
+    url: str = Field(description="The url of the source")
+    title: str = Field(default="", description="The title of the page")
+    reason: str = Field(default="", description="Why the source is trustworthy and relevant to the topic")
+
+
+class SearchResults(BaseModel):
+    """The output of the search task"""
+
+    urls: List[SearchResult] = Field(description="The most relevant sources, best first")
+
+
+class ScrapedSource(BaseModel):
+    """The information extracted from a scraped source"""
+
+    url: str = Field(description="The url of the source")
+    title: str = Field(default="", description="The title of the page")
+    category: str = Field(
+        default="article",
+        description="One of: news, article, technical report, community discussion, academic paper",
+    )
+    summary: str = Field(description="A summary of the information the source gives about the topic")
+    key_points: List[str] = Field(default_factory=list, description="The key facts, trends and examples")
+
+
+class ScrapeResults(BaseModel):
+    """The output of the scrape task"""
+
+    sources: List[ScrapedSource] = Field(description="The information extracted from each scraped source")
+
+
+def parse_output(schema: Type[Schema], output: object) -> Optional[Schema]:
+    """Validate the output of a task against its schema
+
+    :param Type[Schema] schema: The expected schema
+    :param object output: The output, either an instance of the schema, a dict or a text containing a JSON object
+    :return Optional[Schema]: The validated output, None if it does not match the schema
+    """
+    if isinstance(output, schema):
+        return output
+    try:
+        if isinstance(output, dict):
+            return schema.model_validate(output)
+        match = JSON_OBJECT_PATTERN.search(str(output))
+        return schema.model_validate_json(match.group(0)) if match else None
+    except ValidationError:
+        return None
@@ -0,0 +1,138 @@
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from techsage.utils.constants import DOMAIN_REPUTATION, SOURCE_SELECTION_CONFIG
+from techsage.utils.urls import canonicalize_url
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+")
+STOP_WORDS = {"the", "and", "for", "with", "what", "how", "new", "latest", "about", "from", "into", "are", "why"}
+
+
+def _tokens(text: str) -> set:
+    """Get the meaningful lowercased words of a text
+
+    :param str text: The text
+    :return set: The words
+    """
+    return {t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in STOP_WORDS}
+
+
+class SourceSelector:
+    """Select the sources of a topic without LLM: template queries ranked by domain reputation and
+    lexical relevance to the topic"""
+
+    def __init__(self, search: Callable[[str], List[Dict[str, str]]], config: Optional[Dict] = None) -> None:
+        """Initialize the selector
+
+        :param Callable[[str], List[Dict[str, str]]] search: The function returning the url, title and snippet of
+        the results of a query
+        :param Optional[Dict] config: The source selection configuration, default SOURCE_SELECTION_CONFIG
+        """
+        self.search = search
+        self.config = {**SOURCE_SELECTION_CONFIG, **(config or {})}
+        self.reputations = {**DOMAIN_REPUTATION, **self._load_domains_file()}
+
+    def _load_domains_file(self) -> Dict[str, float]:
+        """Load the domain reputations overridden by the user
+
+        :return Dict[str, float]: The reputation of each domain, empty if there is no valid file
+        """
+        try:
+            with open(self.config["domains_file"], "r") as f:
+                return {k.lower(): float(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def reputation(self, url: str) -> float:
+        """Get the reputation of the domain of an url, or of its closest parent domain
+
+        :param str url: The url
+        :return float: The reputation between 0 and 1
+        """
+        host = (urlsplit(url).hostname or "").lower()
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            domain = ".".join(labels[i:])
+            if domain in self.reputations:
+                return self.reputations[domain]
+        return self.config["default_reputation"]
+
+    @staticmethod
+    def relevance(topic_tokens: set, result: Dict[str, str]) -> float:
+        """Compute the lexical relevance of a result to the topic
+
+        :param set topic_tokens: The words of the topic
+        :param Dict[str, str] result: The result with its url, title and snippet
+        :return float: The relevance between 0 and 1, the title counting twice as much as the snippet and url
+        """
+        if not topic_tokens:
+            return 0.0
+        title = _tokens(result.get("title", ""))
+        body = _tokens(f"{result.get('snippet', '')} {urlsplit(result['url']).path.replace('-', ' ')}")
+        return (2 * len(topic_tokens & title) + len(topic_tokens & (body | title))) / (3 * len(topic_tokens))
+
+    def queries(self, topic: str) -> List[str]:
+        """Generate the queries of a topic
+
+        :param str topic: The topic
+        :return List[str]: The queries
+        """
+        return [template.format(topic=topic) for template in self.config["query_templates"]]
+
+    def select(self, topic: str) -> List[Dict]:
+        """Search the topic and select the best sources
+
+        :param str topic: The topic
+        :return List[Dict]: The selected sources with their url, title, score and the reason of their selection
+        """
+        queries = self.queries(topic)
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            # each search runs in a copy of the context to keep the time budget of the run
+            futures = [executor.submit(copy_context().run, self.search, q) for q in queries]
+            responses = []
+            for future in futures:
+                try:
+                    responses.append(future.result())
+                except Exception:
+                    responses.append([])
+
+        topic_tokens = _tokens(topic)
+        candidates: Dict[str, Dict] = {}
+        for results in responses:
+            for rank, result in enumerate(results):
+                canonical_url = canonicalize_url(result["url"])
+                rank_bonus = 1 / (1 + rank)
+                if canonical_url in candidates:
+                    candidates[canonical_url]["rank_bonus"] = min(1.0, candidates[canonical_url]["rank_bonus"] + 0.5)
+                    continue
+                candidates[canonical_url] = {
+                    **result,
+                    "reputation": self.reputation(result["url"]),
+                    "relevance": self.relevance(topic_tokens, result),
+                    "rank_bonus": rank_bonus,
+                }
+
+        config = self.config
+        for candidate in candidates.values():
+            candidate["score"] = (
+                config["reputation_weight"] * candidate["reputation"]
+                + config["relevance_weight"] * candidate["relevance"]
+                + config["rank_weight"] * candidate["rank_bonus"]
+            )
+        selected, per_domain = [], {}
+        for candidate in sorted(candidates.values(), key=lambda x: -x["score"]):
+            domain = urlsplit(canonicalize_url(candidate["url"])).hostname
+            if per_domain.get(domain, 0) >= config["max_per_domain"]:
+                continue
+            per_domain[domain] = per_domain.get(domain, 0) + 1
+            candidate["reason"] = (
+                f"domain reputation {candidate['reputation']:.2f}, relevance to the topic {candidate['relevance']:.2f}"
+            )
+            selected.append(candidate)
+            if len(selected) >= config["top_urls"]:
+                break
+        return selected
@@ -1,17 +1,28 @@
 from textwrap import dedent
+from typing import List, Optional
 
 from crewai import Agent, Task
 
+from techsage.agent_core.schemas import ScrapeResults, SearchResults
+
+# braces are doubled because crewAI formats the prompts with the kickoff inputs
+SEARCH_OUTPUT_EXAMPLE = '{{"urls": [{{"url": "...", "title": "...", "reason": "..."}}]}}'
+SCRAPE_OUTPUT_EXAMPLE = (
+    '{{"sources": [{{"url": "...", "title": "...", "category": "...", "summary": "...", "key_points": ["..."]}}]}}'
+)
+
 
 class TechSageTasks:
     """Definition of the tasks"""
 
-    def __init__(self, topic: str) -> None:
+    def __init__(self, topic: str, previous_report: Optional[str] = None) -> None:
         """Initialize the tasks
 
         :param str topic: The topic on which the tasks are defined
+        :param Optional[str] previous_report: The report of the previous run in incremental mode, default None
         """
         self.topic = topic
+        self.previous_report = previous_report
 
     def search_task(self, agent: Agent) -> Task:
         """A task to search relevant sources of data for the topic
@@ -28,6 +39,7 @@ class TechSageTasks:
                     and cloud architecture.
 
                     Guidelines:
+                    - Check the knowledge base first, it contains content scraped during previous researches.
                     - Do not use special search keywords like 'site:', 'inurl:', 'intitle:', etc.
                     - Use simple and direct search queries. For example: "sagemaker tutorial",
                     "latest trends in AI", "Python programming tips".
@@ -43,24 +55,33 @@ class TechSageTasks:
             ),
             expected_output=dedent(
                 f"""
-                    The output should be a list of the top 5 most relevant URLs that could contain
-                    useful information for {self.topic}. Each URL should be accompanied by a brief
-                    description of why it is considered trustworthy and relevant.
+                    The output should be only a JSON object listing the top 5 most relevant URLs that could
+                    contain useful information for {self.topic}. Each URL should be accompanied by a brief
+                    reason why it is considered trustworthy and relevant:
+                    {SEARCH_OUTPUT_EXAMPLE}
                     """
             ),
+            output_pydantic=SearchResults,
             agent=agent,
         )
 
-    def scrape_task(self, agent: Agent) -> Task:
+    def scrape_task(
+        self, agent: Agent, sources: Optional[SearchResults] = None, context: Optional[List[Task]] = None
+    ) -> Task:
         """A task to scrap and extract relevant info from identified websites
 
         :param Agent agent: The agent to assign to the task
+        :param Optional[SearchResults] sources: The websites to scrape, default None for the websites identified by
+        the search task
+        :param Optional[List[Task]] context: The tasks whose output is given to the task, default None
         :return Task: The created task
         """
+        websites = "the websites listed below" if sources else "the previously identified websites"
+        listing = sources.model_dump_json().replace("{", "{{").replace("}", "}}") if sources else ""
         return Task(
             description=dedent(
                 f"""
-                Scrape the previously identified websites to extract detailed and accurate information
+                Scrape {websites} to extract detailed and accurate information
                 about {self.topic}. The data to be gathered should include, but is not limited to:
                 - Latest news and trends
                 - In-depth articles
@@ -72,32 +93,33 @@ class TechSageTasks:
                 - Ensure the data is parsed and formatted correctly.
                 - Clean the data to remove any irrelevant or duplicate information.
                 - Validate the accuracy of the extracted data where possible.
-                - Store the extracted data in a structured format such as JSON or CSV.
+                - Keep one record per scraped source.
 
                 Topic: {self.topic}
                 """
-            ),
+            )
+            + listing,
             expected_output=dedent(
-                """
-                The output should include the following details in a structured format:
-                - Latest news and trends
-                - In-depth articles
-                - Technical reports
-                - Community discussions
-                - Academic papers
-
-                Ensure the data is well-organized and formatted, ready for further processing or analysis.
+                f"""
+                The output should be only a JSON object with one record per scraped source. The category is one
+                of: news, article, technical report, community discussion, academic paper.
+                {SCRAPE_OUTPUT_EXAMPLE}
                 """
             ),
+            output_pydantic=ScrapeResults,
+            context=context,
             agent=agent,
         )
 
-    def generate_content_task(self, agent: Agent) -> Task:
+    def generate_content_task(self, agent: Agent, context: Optional[List[Task]] = None) -> Task:
         """A task to generate insightful content based on collected data
 
         :param Agent agent: The agent to assign to the task
+        :param Optional[List[Task]] context: The tasks whose output is given to the task, default None
         :return Task: The created task
         """
+        if self.previous_report:
+            return self.generate_delta_task(agent, context)
         return Task(
             description=dedent(
                 f"""
@@ -125,5 +147,46 @@ class TechSageTasks:
                 Ensure the format is compatible with chat format because it will be directly sent into a chat.
                 """
             ),
+            context=context,
+            agent=agent,
+        )
+
+    def generate_delta_task(self, agent: Agent, context: Optional[List[Task]] = None) -> Task:
+        """A task to generate a digest of what changed since the previous report
+
+        :param Agent agent: The agent to assign to the task
+        :param Optional[List[Task]] context: The tasks whose output is given to the task, default None
+        :return Task: The created task
+        """
+        return Task(
+            description=dedent(
+                f"""
+                Generate a digest of what is new about {self.topic} since the previous report.
+                The scraped sources unchanged since the previous report were already removed,
+                only the new or changed content is given.
+
+                Guidelines:
+                - Do not repeat information already present in the previous report.
+                - Summarize the new trends, news and insights.
+                - Highlight what changed compared to the previous report.
+                - If nothing new was found, say it in one sentence.
+
+                Topic: {self.topic}
+
+                Previous report:
+                """
+            )
+            + self.previous_report.replace("{", "{{").replace("}", "}}"),
+            expected_output=dedent(
+                """
+                The output should be a short digest titled "What's new since last run" that includes:
+                - The new trends and insights
+                - The changes compared to the previous report
+                - The relevant new examples or sources
+
+                Ensure the format is compatible with chat format because it will be directly sent into a chat.
+                """
+            ),
+            context=context,
             agent=agent,
         )
@@ -1,7 +1,7 @@
 import json
 import os
-from typing import Optional
-from urllib.parse import urlencode
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit
 
 import requests
 from bs4 import BeautifulSoup
@@ -9,6 +9,15 @@ from crewai_tools import tool
 from duckduckgo_search import DDGS
 from lxml import etree
 
+from techsage.agent_core.context import current_deadline, get_current_run
+from techsage.utils.constants import PREFETCH_CONFIG
+from techsage.utils.deadline import Deadline
+from techsage.utils.fetch import fetch_scheduler
+from techsage.utils.retrieval import get_retrieval_index
+from techsage.utils.seen_index import get_seen_url_index
+from techsage.utils.topic_state import content_hash
+from techsage.utils.urls import canonicalize_url, clean_url, extract_urls
+
 
 @tool("Scraping tool")
 def scrap_website_tool(website_url: str) -> str:
@@ -17,33 +26,97 @@ def scrap_website_tool(website_url: str) -> str:
     :param str website_url: The url of the website to scrap
     :return str: The HTML dom of the scraped website
     """
+    website_url = clean_url(website_url)
+    canonical_url = canonicalize_url(website_url)
+    run = get_current_run()
+    if run and not run.mark_scraped(canonical_url):
+        return f"Already scraped during this run, see the previous output: {website_url}"
     try:
-        website_url = website_url.replace('"', "")
-        page = requests.get(
-            website_url,
-            timeout=15,
-            headers={
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)\
- Chrome/96.0.4664.110 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng\
-,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Referer": "https://www.google.com/",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Accept-Encoding": "gzip, deflate, br",
-            },
-            cookies={},
-        )
-        parsed = BeautifulSoup(page.content, "html.parser")
-        text = parsed.get_text()
-        text = "\n".join([i for i in text.split("\n") if i.strip() != ""])
-        text = " ".join([i for i in text.split(" ") if i.strip() != ""])
+        seen_urls = get_seen_url_index()
+        text = get_retrieval_index().get_text(canonical_url) if seen_urls.is_fresh(canonical_url) else None
+        if text is None and run and run.prefetcher:
+            text = run.prefetcher.get(canonical_url, run.deadline)
+            if text is not None:
+                seen_urls.add(canonical_url)
+                index_content(canonical_url, text)
+        if text is None:
+            text = scrape_page(website_url, run.deadline if run else None)
+            seen_urls.add(canonical_url)
+            index_content(canonical_url, text)
+
+        if run and run.is_unchanged(canonical_url, content_hash(text)):
+            return f"Content unchanged since the last run, already covered by the previous report: {website_url}"
+        if run:
+            run.add_source(canonical_url, text)
         return text
     except requests.RequestException as e:
+        if run:
+            run.scraped_urls.discard(canonical_url)
         return f"Error scraping website: {e}"
 
 
+def scrape_page(url: str, deadline: Optional[Deadline] = None) -> str:
+    """Fetch a page and extract its text content
+
+    :param str url: The url of the page
+    :param Optional[Deadline] deadline: The time budget bounding the fetch, default None
+    :raises requests.RequestException: If the page could not be fetched or answered with an error status
+    :return str: The text content of the page
+    """
+    page = fetch_scheduler.get(
+        url,
+        deadline,
+        headers={
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)\
+ Chrome/96.0.4664.110 Safari/537.36",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng\
+,*/*;q=0.8,application/signed-exchange;v=b3;q=0.9",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Referer": "https://www.google.com/",
+            "Connection": "keep-alive",
+            "Upgrade-Insecure-Requests": "1",
+            "Accept-Encoding": "gzip, deflate, br",
+        },
+        cookies={},
+    )
+    page.raise_for_status()  # error pages must not be indexed nor marked as seen
+    parsed = BeautifulSoup(page.content, "html.parser")
+    text = parsed.get_text()
+    text = "\n".join([i for i in text.split("\n") if i.strip() != ""])
+    text = " ".join([i for i in text.split(" ") if i.strip() != ""])
+    return text
+
+
+def index_content(url: str, text: str) -> None:
+    """Store scraped content in the local retrieval index, never failing the scraping
+
+    The index is only a cache of the scraped pages, a page that could not be indexed is scraped again later.
+
+    :param str url: The url of the scraped page
+    :param str text: The text content of the page
+    """
+    try:
+        get_retrieval_index().add(url, text, current_deadline())
+    except Exception:
+        pass
+
+
+@tool("Knowledge base tool")
+def knowledge_base_tool(query: str) -> str:
+    """Search the content already scraped during previous researches
+
+    :param str query: The value to search for in the knowledge base
+    :return str: The most relevant passages with their source url
+    """
+    try:
+        results = get_retrieval_index().search(query.replace('"', ""), deadline=current_deadline())
+    except Exception as e:
+        return f"Error searching the knowledge base: {e}"
+    if not results:
+        return "No relevant content found in the knowledge base."
+    return "\n\n".join([f"Source: {r['url']}\n{r['text']}" for r in results])
+
+
 @tool("DuckDuckGo searching tool")
 def duckduckgo_search_tool(search_value: str) -> str:
     """Perform a duckduckgo search with the given search_value.
@@ -51,7 +124,10 @@ def duckduckgo_search_tool(search_value: str) -> str:
     :param str search_value: The value to use as input for the search
     :return Optional[str]: The google HTML results
     """
-    res = "\n".join([str(x) for x in DDGS().text(search_value, max_results=5)])
+    deadline = current_deadline()
+    timeout = max(1, int(deadline.timeout(10))) if deadline else 10
+    res = "\n".join([str(x) for x in DDGS(timeout=timeout).text(search_value, max_results=5)])
+    prefetch_results(res)
     return res
 
 
@@ -62,16 +138,78 @@ def google_search_tool(search_value: str) -> Optional[str]:
     :param str search_value: The value to use as input for the search
     :return Optional[str]: The google HTML results, None if something failed
     """
-    url = "https://www.google.com/search?" + urlencode(
-        {"q": search_value, "hl": "en", "start": 0, "num": 10, "sourceid": "chrome", "ie": "UTF-8"}
-    )
+    url = google_search_url(search_value)
     if os.environ.get("GOOGLE_SEARCH_API_KEY", "") not in ["NA", ""]:
         res = api_google_search(url)
     else:
         res = local_google_search(url)
+    prefetch_results(res)
     return res
 
 
+def google_search_url(search_value: str) -> str:
+    """Build the url of a google search
+
+    :param str search_value: The value to use as input for the search
+    :return str: The google search url
+    """
+    return "https://www.google.com/search?" + urlencode(
+        {"q": search_value, "hl": "en", "start": 0, "num": 10, "sourceid": "chrome", "ie": "UTF-8"}
+    )
+
+
+def search_web(search_value: str) -> List[Dict[str, str]]:
+    """Perform a google search returning structured results, with duckduckgo as fallback
+
+    :param str search_value: The value to use as input for the search
+    :raises Exception: If both searches failed
+    :return List[Dict[str, str]]: The results with their url, title and snippet, in ranking order
+    """
+    url = google_search_url(search_value)
+    try:
+        if os.environ.get("GOOGLE_SEARCH_API_KEY", "") not in ["NA", ""]:
+            entries = api_google_results(url)
+            results = [{"url": u, "title": "", "snippet": e} for e in entries for u in extract_urls(e, 1)]
+        else:
+            results = parse_results(local_google_dom(url))
+    except (requests.RequestException, KeyError, ValueError):
+        results = []
+    if results:
+        return results
+    deadline = current_deadline()
+    timeout = max(1, int(deadline.timeout(10))) if deadline else 10
+    return [
+        {"url": x["href"], "title": x["title"], "snippet": x["body"]}
+        for x in DDGS(timeout=timeout).text(search_value, max_results=10)
+    ]
+
+
+def prefetch_results(results: str) -> None:
+    """Start fetching the top results of a search in the background, to serve them when the scraper asks
+
+    :param str results: The output of a search tool
+    """
+    prefetch_urls(extract_urls(results, PREFETCH_CONFIG["top_results"]))
+
+
+def prefetch_urls(urls: List[str]) -> None:
+    """Start fetching pages in the background, skipping those already scraped or fresh in the index
+
+    :param List[str] urls: The urls of the pages
+    """
+    run = get_current_run()
+    if not run or not run.prefetcher:
+        return
+    seen_urls = get_seen_url_index()
+    run.prefetcher.prefetch(
+        [
+            url
+            for url in urls
+            if canonicalize_url(url) not in run.scraped_urls and not seen_urls.is_fresh(canonicalize_url(url))
+        ]
+    )
+
+
 def local_google_search(url: str) -> str:
     """Perform a local google search
 
@@ -79,39 +217,79 @@ def local_google_search(url: str) -> str:
     :return str: The google results or the encountered error
     """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)\
- Chrome/112.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-        }
-        dom = requests.get(url, headers=headers, cookies={"CONSENT": "YES+"}).text
+        dom = local_google_dom(url)
         res = extract_results(dom)
         return res
     except Exception as e:
         return f"Error performing Google search: {e}"
 
 
-def extract_results(dom: str) -> str:
-    """Extract the results from the google search
+def local_google_dom(url: str) -> str:
+    """Fetch the page of a google search
+
+    :param str url: The google url to search
+    :raises requests.RequestException: If the page could not be fetched
+    :return str: The dom of the google search
+    """
+    headers = {
+        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko)\
+ Chrome/112.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+        "DNT": "1",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    }
+    return fetch_scheduler.get(url, current_deadline(), headers=headers, cookies={"CONSENT": "YES+"}).text
+
+
+def parse_results(dom: str) -> List[Dict[str, str]]:
+    """Parse the results of a google search
 
     :param str dom: The dom of the google search
-    :return str: The google results
+    :return List[Dict[str, str]]: The results with their url, title and snippet, in ranking order
     """
     xml_tree = etree.HTML(dom, parser=None)
+    if xml_tree is None:
+        return []
     blocks = xml_tree.xpath(
         "//div[@id='search']//div[(contains(@class, 'g ') or @class='g') and descendant::a[@href != ''] "
         "and not(descendant::div[contains(@class, 'g ') or @class='g']) "
         "and not(descendant::span[text()='See results about'])]"
     )
-    res = "\n".join(["".join(block.itertext()) for block in blocks])
+    return [
+        {
+            "url": result_link(block),
+            "title": "".join(block.xpath(".//h3//text()")),
+            "snippet": "".join(block.itertext()),
+        }
+        for block in blocks
+    ]
+
+
+def extract_results(dom: str) -> str:
+    """Extract the results from the google search
+
+    :param str dom: The dom of the google search
+    :return str: The google results
+    """
+    res = "\n".join([f"{r['url']}\n{r['snippet']}" for r in parse_results(dom)])
     return res
 
 
+def result_link(block: etree._Element) -> str:
+    """Get the link of a google result block
+
+    :param etree._Element block: The result block
+    :return str: The url of the result, resolved if it is a google redirection
+    """
+    href = block.xpath(".//a/@href")[0]
+    if href.startswith("/url?"):
+        href = parse_qs(urlsplit(href).query).get("q", [href])[0]
+    return href
+
+
 def api_google_search(url: str) -> str:
     """Perform a google search using a google search api
 
@@ -119,18 +297,28 @@ def api_google_search(url: str) -> str:
     :return str: The google results or the encountered error
     """
     try:
-        # Delpha API
-        headers = {
-            "Content-Type": "application/json;charset=UTF-8",
-            "Authorization": os.environ["GOOGLE_SEARCH_API_KEY"],
-        }
-        api_url = "https://delpha-recommender.delpha.io/global/v1/google-search"
-        resp = requests.request(
-            "POST",
-            api_url,
-            headers=headers,
-            data=json.dumps({"url": url}),
-        ).json()
-        return "\n".join(resp["results"]["searches_text"])
+        return "\n".join(api_google_results(url))
     except Exception as e:
         return f"Error performing Google search: {e}"
+
+
+def api_google_results(url: str) -> List[str]:
+    """Get the results of a google search from a google search api
+
+    :param str url: The google url to search
+    :raises requests.RequestException: If the api could not be reached
+    :return List[str]: The text of each result
+    """
+    # Delpha API
+    headers = {
+        "Content-Type": "application/json;charset=UTF-8",
+        "Authorization": os.environ["GOOGLE_SEARCH_API_KEY"],
+    }
+    api_url = "https://delpha-recommender.delpha.io/global/v1/google-search"
+    resp = fetch_scheduler.post(
+        api_url,
+        current_deadline(),
+        headers=headers,
+        data=json.dumps({"url": url}),
+    ).json()
+    return resp["results"]["searches_text"]
@@ -1,5 +1,6 @@
 import os
 import traceback
+from datetime import datetime
 from typing import Callable, Union
 
 import streamlit as st
@@ -8,6 +9,7 @@ from techsage.agent_core.crew import TechSageCrew
 from techsage.configure import configure
 from techsage.utils.constants import DEFAULT_CONFIG
 from techsage.utils.load_config import load_config
+from techsage.utils.report_store import get_report_store
 from techsage.utils.tools import ansi_to_html
 
 
@@ -35,12 +37,21 @@ class TechSageChatApp:
             st.text_input("OpenAI API Key", key="openai_key")
             st.text_input("Google Search API Key", key="google_key")
             st.checkbox("Local", key="local")
+            st.checkbox("Incremental", key="incremental", help="Only report what is new since the last run")
+            st.checkbox("Fast search", key="fast_search", help="Select the sources without the searcher agent")
+            st.checkbox("Reuse recent reports", key="reuse_recent", value=True, help="Answer from a report of today")
+            st.number_input(
+                "Time budget (s)", key="deadline", min_value=0, value=0, step=30, help="0 for no limit"
+            )
             col1, col2 = st.columns(2)
             with col1:
                 st.button("Save", on_click=self._save_config)
             with col2:
                 st.button("Refresh", on_click=self._load_current_config)
 
+            st.title("Past reports")
+            self._display_past_reports(st.text_input("Search", key="report_query"))
+
         self._display_chat_history()
         if prompt := st.chat_input("Authentication services.."):
             self._run(prompt)
@@ -73,6 +84,37 @@ class TechSageChatApp:
         if "local" not in st.session_state:
             st.session_state["local"] = os.environ.get("LOCAL", DEFAULT_CONFIG["local"]).lower() == "true"
 
+    def _display_past_reports(self, query: str) -> None:
+        """Display the past reports matching a query, each one can be opened in the chat
+
+        :param str query: The words to search for, the latest reports are displayed if empty
+        """
+        try:
+            reports = get_report_store().search(query)
+        except Exception as e:
+            st.write(f"❌ Error searching the reports: {e}")
+            return
+        for report in reports:
+            date = datetime.fromtimestamp(report["created_at"]).strftime("%Y-%m-%d %H:%M")
+            st.button(
+                f"{report['topic']} ({date})",
+                key=f"report_{report['id']}",
+                help=report["snippet"],
+                on_click=self._open_report,
+                args=(report["id"],),
+            )
+
+    def _open_report(self, report_id: int) -> None:
+        """Add a past report to the chat history
+
+        :param int report_id: The id of the report
+        """
+        report = get_report_store().get(report_id)
+        if report:
+            date = datetime.fromtimestamp(report["created_at"]).strftime("%Y-%m-%d %H:%M")
+            message = f"Report of {date} on {report['topic']}:\n\n{report['report']}"
+            st.session_state.chat_history.append({"role": "Reports", "message": message, "avatar": "📚"})
+
     def _display_chat_history(self) -> None:
         """Display the chat history in the Streamlit app"""
         for i, message in enumerate(st.session_state.chat_history):
@@ -108,7 +150,14 @@ class TechSageChatApp:
         if topic.strip() != "":
             try:
                 self.add_to_chat(topic)
-                techsage_crew = TechSageCrew(topic, add_to_chat=self.add_to_chat)
+                techsage_crew = TechSageCrew(
+                    topic,
+                    add_to_chat=self.add_to_chat,
+                    incremental=st.session_state.get("incremental", False),
+                    reuse_recent=st.session_state.get("reuse_recent", True),
+                    deadline=st.session_state.get("deadline") or None,
+                    fast_search=st.session_state.get("fast_search", False),
+                )
                 techsage_crew.run()
             except Exception as e:
                 error_message = f"❌ An error occurred during the search:\n{e}\n{traceback.format_exc()}"
@@ -8,7 +8,7 @@ from typing import Optional
 import click
 import psutil
 
-from techsage.utils.constants import APP_FOLDER, DEFAULT_CONFIG
+from techsage.utils.constants import APP_FOLDER, DEFAULT_CONFIG, RETRIEVAL_CONFIG
 
 VERBOSE = 0
 
@@ -73,6 +73,25 @@ def pull_model(model_name: str) -> None:
         sys.exit(1)
 
 
+def pull_embedding_model(model_name: str) -> None:
+    """
+    Pull the embedding model of the retrieval index using ollama, the index falls back on TF-IDF if it fails.
+
+    :param str model_name: The name of the embedding model to pull.
+    """
+    try:
+        output = None if VERBOSE else subprocess.DEVNULL
+        print(" ⏳ Pulling embedding model...")
+        subprocess.check_call(
+            ["ollama", "pull", model_name],
+            stdout=output,
+            stderr=output,
+        )
+        print(" ✅ Embedding model is ready")
+    except subprocess.CalledProcessError:
+        print(f" ⚠️ Failed to pull embedding model {model_name}, the knowledge base will use TF-IDF instead")
+
+
 def create_model(new_model_name: str, config_file_path: str) -> str:
     """
     Create a new model using ollama.
@@ -197,6 +216,7 @@ def configure(
         check_ollama_running()
         model_config_file_path = create_model_file(model, f"{APP_FOLDER}/models/")
         pull_model(model)
+        pull_embedding_model(RETRIEVAL_CONFIG["embedding_model"])
         crewai_model_name = create_model(f"{model}_crewai", model_config_file_path)
     else:
         crewai_model_name = model
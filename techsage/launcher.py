@@ -1,13 +1,17 @@
 import subprocess
 import traceback
+from datetime import datetime
+from typing import Optional
 
 import click
 
-from techsage.utils.constants import LIB_FOLDER
+from techsage.utils.constants import LIB_FOLDER, SERVER_CONFIG
 from techsage.utils.load_config import load_config
 
 load_config()
 from techsage.agent_core.crew import TechSageCrew
+from techsage.server import launch_server
+from techsage.utils.report_store import get_report_store
 
 
 @click.command()
@@ -17,24 +21,107 @@ from techsage.agent_core.crew import TechSageCrew
     default="true",
     help="Set this to True to use streamlit interface, otherwise a shell version will be launched",
 )
-def launch(streamlit: bool) -> None:
+@click.option(
+    "--incremental",
+    "-i",
+    is_flag=True,
+    help="In the shell version, only report what is new since the previous run on the same topic",
+)
+@click.option(
+    "--fresh", is_flag=True, help="In the shell version, always run a new research instead of reusing a report"
+)
+@click.option(
+    "--fast", is_flag=True, help="In the shell version, select the sources by ranking search results without LLM"
+)
+@click.option("--search", default=None, help="Search the past reports matching the given words and open one")
+@click.option(
+    "--deadline",
+    type=float,
+    default=None,
+    help="Time budget of a research in seconds, a partial report is returned when it runs out",
+)
+@click.option("--server", is_flag=True, help="Launch the headless HTTP API instead of an interface")
+@click.option("--host", default=SERVER_CONFIG["host"], help="The host the HTTP API listens on")
+@click.option("--port", default=SERVER_CONFIG["port"], help="The port the HTTP API listens on")
+@click.option("--workers", default=SERVER_CONFIG["workers"], help="The number of researches the HTTP API runs at once")
+@click.option(
+    "--queue_size",
+    default=SERVER_CONFIG["queue_size"],
+    help="The number of researches waiting for a worker before the HTTP API answers 429",
+)
+def launch(
+    streamlit: bool,
+    incremental: bool,
+    fresh: bool,
+    fast: bool,
+    search: Optional[str],
+    deadline: Optional[float],
+    server: bool,
+    host: str,
+    port: int,
+    workers: int,
+    queue_size: int,
+) -> None:
     """Launch the process
 
     :param bool streamlit: If True the streamlit will be launched, otherwise a shell version will be launched
+    :param bool incremental: If True the shell version only reports what is new since the previous run
+    :param bool fresh: If True the shell version never reuses a recent report on the same topic
+    :param bool fast: If True the shell version selects the sources without the searcher agent
+    :param Optional[str] search: If set, search the past reports matching these words instead of launching
+    :param Optional[float] deadline: The time budget of a research in seconds in the shell version and the HTTP API
+    :param bool server: If True the headless HTTP API is launched instead of an interface
+    :param str host: The host the HTTP API listens on
+    :param int port: The port the HTTP API listens on
+    :param int workers: The number of researches the HTTP API runs at once
+    :param int queue_size: The number of researches waiting for a worker before the HTTP API answers 429
     """
-    if streamlit:
+    if search is not None:
+        search_reports(search)
+    elif server:
+        launch_server(host, port, workers, queue_size, deadline)
+    elif streamlit:
         subprocess.run(["streamlit", "run", f"{LIB_FOLDER}/app.py"])
     else:
-        launch_in_shell()
+        launch_in_shell(incremental, fresh, deadline, fast)
+
+
+def search_reports(query: str) -> None:
+    """Search the past reports in the shell and print the chosen one
+
+    :param str query: The words to search for, the latest reports are listed if empty
+    """
+    reports = get_report_store().search(query)
+    if not reports:
+        print(" ❌ No report found")
+        return
+    for report in reports:
+        date = datetime.fromtimestamp(report["created_at"]).strftime("%Y-%m-%d %H:%M")
+        print(f" [{report['id']}] {date} - {report['topic']}\n      {report['snippet']}")
+    report_id = input("Report to open (empty to quit):  ").strip()
+    if report_id.isdigit() and (report := get_report_store().get(int(report_id))):
+        print(report["report"])
+        print("\nSources:\n" + "\n".join(report["sources"]))
 
 
-def launch_in_shell() -> None:
-    """Launch the process in the shell"""
+def launch_in_shell(
+    incremental: bool = False, fresh: bool = False, deadline: Optional[float] = None, fast: bool = False
+) -> None:
+    """Launch the process in the shell
+
+    :param bool incremental: If True only report what is new since the previous run on the topic, default False
+    :param bool fresh: If True never reuse a recent report on the same topic, default False
+    :param Optional[float] deadline: The time budget of the research in seconds, default None for no limit
+    :param bool fast: If True select the sources by ranking search results instead of with the searcher agent,
+    default False
+    """
     try:
         print("\n 👋 Welcome to TechSage Information Gatherer")
         print("---------------------------------------------")
         topic = input("Topic (e.g., Technology, Programming, Cloud Architecture):  ")
-        techsage_crew = TechSageCrew(topic)
+        techsage_crew = TechSageCrew(
+            topic, incremental=incremental, reuse_recent=not fresh, deadline=deadline, fast_search=fast
+        )
         result = techsage_crew.run()
         print(result)
     except Exception as e:
@@ -0,0 +1,430 @@
+import asyncio
+import json
+import math
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Dict, List, Optional, Tuple
+
+from techsage.agent_core.crew import TechSageCrew
+from techsage.utils.constants import LLM_PRIORITIES, SERVER_CONFIG
+from techsage.utils.llm_scheduler import llm_scheduler
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class Job:
+    """A research submitted to the server"""
+
+    def __init__(
+        self,
+        topic: str,
+        incremental: bool = False,
+        deadline: Optional[float] = None,
+        priority: str = "background",
+        fast: bool = False,
+        fresh: bool = False,
+    ) -> None:
+        """Initialize the job
+
+        :param str topic: The topic to research
+        :param bool incremental: If True only report what is new since the previous run on the topic, default False
+        :param Optional[float] deadline: The time budget of the research in seconds, default None for no limit
+        :param str priority: The priority of the LLM requests of the research, default background
+        :param bool fast: If True the sources are selected without the searcher agent, default False
+        :param bool fresh: If True a new research is run even if a recent report on the topic exists, default False
+        """
+        self.id = uuid.uuid4().hex
+        self.topic = topic
+        self.incremental = incremental
+        self.deadline = deadline
+        self.priority = priority
+        self.fast = fast
+        self.fresh = fresh
+        self.status = "queued"
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.events: List[Dict] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def key(self) -> str:
+        """The key used to coalesce identical submissions"""
+        return f"{self.incremental}:{self.fast}:{self.fresh}:{' '.join(self.topic.lower().split())}"
+
+    def _notify(self) -> None:
+        """Wake up the clients streaming the job"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def add_event(self, message: str, username: str = "", avatar: str = "") -> None:
+        """Record a progress message of the crew
+
+        :param str message: The message
+        :param str username: The name of the agent sending the message, default ""
+        :param str avatar: Unused, kept to match the chat callback signature, default ""
+        """
+        self.events.append({"agent": username, "message": str(message), "time": time.time()})
+        self._notify()
+
+    def set_status(self, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Update the status of the job
+
+        :param str status: The new status
+        :param Optional[str] result: The report if the job is done, default None
+        :param Optional[str] error: The error if the job failed, default None
+        """
+        self.status = status
+        if status == "running":
+            self.started_at = time.time()
+        if status in TERMINAL_STATUSES:
+            self.finished_at = time.time()
+            self.result, self.error = result, error
+        self._notify()
+
+    async def wait_change(self, timeout: float) -> None:
+        """Wait until the job changes or the timeout expires
+
+        :param float timeout: The maximum time to wait in seconds
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def to_dict(self, with_result: bool = False) -> Dict:
+        """Serialize the job
+
+        :param bool with_result: If True the report is included, default False
+        :return Dict: The serialized job
+        """
+        job = {
+            "id": self.id,
+            "topic": self.topic,
+            "incremental": self.incremental,
+            "deadline": self.deadline,
+            "priority": self.priority,
+            "fast": self.fast,
+            "fresh": self.fresh,
+            "status": self.status,
+            "error": self.error,
+            "events": len(self.events),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if with_result:
+            job["result"] = self.result
+        return job
+
+
+class TechSageServer:
+    """Headless HTTP API running the crews in a bounded pool of workers"""
+
+    def __init__(
+        self,
+        workers: int = SERVER_CONFIG["workers"],
+        queue_size: int = SERVER_CONFIG["queue_size"],
+        deadline: Optional[float] = None,
+    ) -> None:
+        """Initialize the server
+
+        :param int workers: The number of crews running at the same time, default from the configuration
+        :param int queue_size: The number of jobs waiting for a worker before rejecting new ones, default from the
+        configuration
+        :param Optional[float] deadline: The default time budget of a research in seconds, default None for no limit
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.deadline = deadline
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="techsage-worker")
+
+    def submit(
+        self,
+        topic: str,
+        incremental: bool = False,
+        deadline: Optional[float] = None,
+        priority: str = "background",
+        fast: bool = False,
+        fresh: bool = False,
+    ) -> Tuple[Job, bool]:
+        """Submit a research, coalesced with an identical queued or running one
+
+        :param str topic: The topic to research
+        :param bool incremental: If True only report what is new since the previous run on the topic, default False
+        :param Optional[float] deadline: The time budget of the research in seconds, default the one of the server
+        :param str priority: The priority of the LLM requests of the research, default background
+        :param bool fast: If True the sources are selected without the searcher agent, default False
+        :param bool fresh: If True a new research is run even if a recent report on the topic exists, default False
+        :raises asyncio.QueueFull: If too many jobs are waiting
+        :return Tuple[Job, bool]: The job and True if it was created, False if an identical one was reused
+        """
+        job = Job(topic, incremental, deadline or self.deadline, priority, fast, fresh)
+        if job.key in self._active:
+            return self._active[job.key], False
+        self._queue.put_nowait(job)
+        self._active[job.key] = job
+        self._jobs[job.id] = job
+        return job, True
+
+    def _run_job(self, job: Job, loop: asyncio.AbstractEventLoop) -> str:
+        """Run the crew of a job, called in a worker thread
+
+        :param Job job: The job to run
+        :param asyncio.AbstractEventLoop loop: The loop of the server, used to publish the progress
+        :return str: The report
+        """
+
+        def add_to_chat(*args) -> None:
+            loop.call_soon_threadsafe(job.add_event, *args)
+
+        crew = TechSageCrew(
+            job.topic,
+            add_to_chat=add_to_chat,
+            incremental=job.incremental,
+            reuse_recent=not job.fresh,
+            deadline=job.deadline,
+            priority=job.priority,
+            fast_search=job.fast,
+        )
+        return str(crew.run())
+
+    async def _worker(self) -> None:
+        """Process the queued jobs forever"""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.set_status("running")
+            try:
+                result = await loop.run_in_executor(self._executor, self._run_job, job, loop)
+                job.set_status("done", result=result)
+            except Exception as e:
+                job.set_status("failed", error=f"{e}\n{traceback.format_exc()}")
+            finally:
+                self._active.pop(job.key, None)
+                self._forget_finished_jobs()
+                self._queue.task_done()
+
+    def _forget_finished_jobs(self) -> None:
+        """Drop the oldest finished jobs above the retention limit"""
+        finished = [j for j in self._jobs.values() if j.status in TERMINAL_STATUSES]
+        for job in finished[: max(0, len(finished) - SERVER_CONFIG["max_finished_jobs"])]:
+            del self._jobs[job.id]
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        """Read an HTTP request
+
+        :param asyncio.StreamReader reader: The connection reader
+        :raises ValueError: If the request is malformed or too large
+        :return Tuple[str, str, Dict[str, str], bytes]: The method, path, headers and body
+        """
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        while (line := (await reader.readline()).decode("latin-1").strip()) != "":
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        if length > SERVER_CONFIG["max_body_size"]:
+            raise ValueError("Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0].rstrip("/") or "/", headers, body
+
+    async def _send(
+        self,
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        payload: Dict,
+        extra_headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """Send a JSON response
+
+        :param asyncio.StreamWriter writer: The connection writer
+        :param HTTPStatus status: The status of the response
+        :param Dict payload: The JSON payload
+        :param Optional[Dict[str, str]] extra_headers: Additional headers, default None
+        """
+        body = json.dumps(payload).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "close",
+            **(extra_headers or {}),
+        }
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+        writer.write(head.encode() + b"\r\n" + body)
+        await writer.drain()
+
+    async def _stream(self, writer: asyncio.StreamWriter, job: Job) -> None:
+        """Stream the progress of a job as server-sent events until it finishes
+
+        :param asyncio.StreamWriter writer: The connection writer
+        :param Job job: The job to stream
+        """
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n"
+        )
+        sent, status = 0, None
+        while True:
+            for event in job.events[sent:]:
+                writer.write(f"event: message\ndata: {json.dumps(event)}\n\n".encode())
+            sent = len(job.events)
+            if job.status != status:
+                status = job.status
+                final = status in TERMINAL_STATUSES
+                writer.write(f"event: status\ndata: {json.dumps(job.to_dict(with_result=final))}\n\n".encode())
+                if final:
+                    await writer.drain()
+                    return
+            writer.write(b": keep-alive\n\n")
+            await writer.drain()
+            await job.wait_change(timeout=15)
+
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        """Dispatch a request to its handler
+
+        :param str method: The HTTP method
+        :param str path: The path of the request
+        :param bytes body: The body of the request
+        :param asyncio.StreamWriter writer: The connection writer
+        """
+        parts = path.strip("/").split("/")
+        if path == "/health" and method == "GET":
+            running = sum(j.status == "running" for j in self._active.values())
+            await self._send(
+                writer, HTTPStatus.OK, {"status": "ok", "queued": self._queue.qsize(), "running": running}
+            )
+        elif path == "/metrics" and method == "GET":
+            metrics = {"jobs_queued": self._queue.qsize(), "llm": llm_scheduler.metrics()}
+            await self._send(writer, HTTPStatus.OK, metrics)
+        elif path == "/jobs" and method == "POST":
+            await self._submit(body, writer)
+        elif parts[0] == "jobs" and len(parts) in (2, 3) and method == "GET":
+            job = self._jobs.get(parts[1])
+            if job is None:
+                await self._send(writer, HTTPStatus.NOT_FOUND, {"error": "Unknown job"})
+            elif len(parts) == 2:
+                await self._send(writer, HTTPStatus.OK, job.to_dict(with_result=True))
+            elif parts[2] == "events":
+                await self._stream(writer, job)
+            elif parts[2] == "result" and job.status == "done":
+                await self._send(writer, HTTPStatus.OK, {"id": job.id, "topic": job.topic, "result": job.result})
+            elif parts[2] == "result":
+                await self._send(writer, HTTPStatus.CONFLICT, job.to_dict())
+            else:
+                await self._send(writer, HTTPStatus.NOT_FOUND, {"error": "Not found"})
+        elif path in ("/health", "/metrics", "/jobs") or parts[0] == "jobs":
+            await self._send(writer, HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Method not allowed"})
+        else:
+            await self._send(writer, HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+    async def _submit(self, body: bytes, writer: asyncio.StreamWriter) -> None:
+        """Handle a job submission
+
+        :param bytes body: The JSON body of the request, with a 'topic', optional 'incremental', 'fast' and 'fresh'
+        flags, an optional 'deadline' in seconds and an optional 'priority'
+        :param asyncio.StreamWriter writer: The connection writer
+        """
+        try:
+            payload = json.loads(body or b"{}")
+            topic = str(payload.get("topic", "")).strip()
+            deadline = payload.get("deadline")
+            priority = payload.get("priority", "background")
+            incremental, fast = payload.get("incremental", False), payload.get("fast", False)
+            fresh = payload.get("fresh", False)
+        except (ValueError, TypeError, AttributeError):
+            await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": "The body must be a JSON object"})
+            return
+        if topic == "":
+            await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": "Missing topic"})
+            return
+        if deadline is not None and (
+            isinstance(deadline, bool) or not isinstance(deadline, (int, float)) or not 0 < deadline < math.inf
+        ):
+            await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": "The deadline must be a positive number"})
+            return
+        if not all(isinstance(flag, bool) for flag in (incremental, fast, fresh)):
+            await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": "The flags must be JSON booleans"})
+            return
+        if priority not in LLM_PRIORITIES:
+            error = f"The priority must be one of {', '.join(LLM_PRIORITIES)}"
+            await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": error})
+            return
+        try:
+            job, created = self.submit(topic, incremental, deadline, priority, fast, fresh)
+        except asyncio.QueueFull:
+            retry_after = str(SERVER_CONFIG["retry_after"])
+            await self._send(
+                writer, HTTPStatus.TOO_MANY_REQUESTS, {"error": "Too many pending jobs"}, {"Retry-After": retry_after}
+            )
+            return
+        status = HTTPStatus.ACCEPTED if created else HTTPStatus.OK
+        await self._send(writer, status, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handle a client connection
+
+        :param asyncio.StreamReader reader: The connection reader
+        :param asyncio.StreamWriter writer: The connection writer
+        """
+        try:
+            try:
+                method, path, _, body = await self._read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                await self._send(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request"})
+                return
+            await self._route(method, path, body, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = SERVER_CONFIG["host"], port: int = SERVER_CONFIG["port"]) -> None:
+        """Start the workers and serve forever
+
+        :param str host: The host to bind, default from the configuration
+        :param int port: The port to bind, default from the configuration
+        """
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        server = await asyncio.start_server(self._handle, host, port)
+        print(f" ✅ TechSage API listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def launch_server(
+    host: str = SERVER_CONFIG["host"],
+    port: int = SERVER_CONFIG["port"],
+    workers: int = SERVER_CONFIG["workers"],
+    queue_size: int = SERVER_CONFIG["queue_size"],
+    deadline: Optional[float] = None,
+) -> None:
+    """Launch the HTTP API
+
+    :param str host: The host to bind, default from the configuration
+    :param int port: The port to bind, default from the configuration
+    :param int workers: The number of crews running at the same time, default from the configuration
+    :param int queue_size: The number of jobs waiting for a worker before rejecting new ones, default from the
+    configuration
+    :param Optional[float] deadline: The default time budget of a research in seconds, default None for no limit
+    """
+    try:
+        asyncio.run(TechSageServer(workers, queue_size, deadline).serve(host, port))
+    except KeyboardInterrupt:
+        print(" 👋 TechSage API stopped")
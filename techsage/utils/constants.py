@@ -12,3 +12,123 @@ DEFAULT_CONFIG = {
     "google_search_api_key": "NA",
     "openai_api_key": "NA",
 }
+
+FETCH_CONFIG = {
+    "timeout": 15,  # seconds, applied to every request
+    "max_retries": 3,
+    "backoff_base": 1.0,  # seconds, doubled at each retry
+    "backoff_max": 30.0,
+    "rate": 1.0,  # requests per second allowed per host
+    "burst": 3,  # token bucket capacity per host
+    "max_in_flight": 2,  # concurrent requests per host
+    "retry_statuses": [429, 500, 502, 503, 504],
+}
+
+RETRIEVAL_CONFIG = {
+    "embedding_model": "nomic-embed-text",  # served by the configured ollama endpoint
+    "embedding_timeout": 30,
+    "embedding_retry_delay": 300,  # seconds before trying the embedding endpoint again after a failure
+    "chunk_size": 200,  # words
+    "chunk_overlap": 40,  # words
+    "hash_dim": 2048,  # size of the hashed TF-IDF vectors
+    "top_k": 5,
+    "rank_fusion_k": 60,  # damping of the reciprocal rank fusion of the TF-IDF and embedding rankings
+}
+
+SEEN_URL_CONFIG = {
+    "ttl": 12 * 3600,  # seconds during which a fetched page is served from the local index
+}
+
+SERVER_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8000,
+    "workers": 2,  # crews running at the same time
+    "queue_size": 16,  # jobs waiting for a worker before answering 429
+    "retry_after": 30,  # seconds suggested to the clients when the queue is full
+    "max_finished_jobs": 1000,  # finished jobs kept in memory for polling
+    "max_body_size": 64 * 1024,
+}
+
+REPORT_CONFIG = {
+    "max_age": 24 * 3600,  # seconds during which a report is reused instead of starting a new crew
+    "search_limit": 10,
+}
+
+DEADLINE_CONFIG = {
+    "phases": {"search": 0.3, "scrape": 0.4, "generate": 0.3},  # share of the run budget, in execution order
+    "summary_reserve": 15,  # seconds kept at the end of the budget to summarize the gathered content
+    "max_summary_share": 0.2,  # share of the budget the summary reserve can take at most
+    "excerpt_size": 1500,  # characters kept per source in a partial report
+}
+
+LLM_SCHEDULER_CONFIG = {
+    "initial_limit": 4,  # concurrent requests allowed on the model server at start
+    "min_limit": 1,
+    "max_limit": 32,
+    "backoff_factor": 0.5,  # limit multiplier on a 429, 5xx or timeout
+    "latency_factor": 0.9,  # limit multiplier when the latency degrades
+    "latency_tolerance": 2.0,  # a request slower than this times the usual latency signals congestion
+    "latency_smoothing": 0.05,  # weight of a new request in the usual latency
+    "metrics_window": 1000,  # requests kept to compute the wait time metrics
+    "max_retries": 2,  # retries of a request failing on overload, each one waiting for a new slot
+    "backoff_base": 1.0,
+    "backoff_max": 30,
+}
+LLM_PRIORITIES = {"interactive": 0, "background": 1}
+LLM_CLIENT_CONFIG = {
+    "max_connections": 32,  # connections of the HTTP pool shared by all the clients
+    "max_keepalive_connections": 8,
+    "keepalive_expiry": 30,
+}
+
+PREFETCH_CONFIG = {
+    "top_results": 5,  # search results fetched in the background as soon as a search returns
+    "workers": 4,
+}
+
+SOURCE_SELECTION_CONFIG = {
+    "query_templates": ["{topic}", "{topic} latest news", "{topic} in-depth guide", "{topic} best practices"],
+    "top_urls": 5,
+    "max_per_domain": 2,
+    "reputation_weight": 0.5,
+    "relevance_weight": 0.4,
+    "rank_weight": 0.1,  # bonus for results ranked high or returned by several queries
+    "default_reputation": 0.4,  # reputation of the domains missing from the table
+    "domains_file": f"{APP_FOLDER}/domains.json",  # optional {"domain": reputation} overrides
+}
+DOMAIN_REPUTATION = {
+    "arxiv.org": 0.95,
+    "acm.org": 0.9,
+    "ieee.org": 0.9,
+    "github.com": 0.85,
+    "github.blog": 0.85,
+    "stackoverflow.com": 0.8,
+    "developer.mozilla.org": 0.9,
+    "docs.python.org": 0.9,
+    "python.org": 0.85,
+    "kubernetes.io": 0.9,
+    "docs.docker.com": 0.9,
+    "aws.amazon.com": 0.9,
+    "cloud.google.com": 0.9,
+    "learn.microsoft.com": 0.9,
+    "engineering.fb.com": 0.85,
+    "netflixtechblog.com": 0.85,
+    "martinfowler.com": 0.85,
+    "infoq.com": 0.8,
+    "thenewstack.io": 0.8,
+    "arstechnica.com": 0.75,
+    "techcrunch.com": 0.7,
+    "theregister.com": 0.7,
+    "zdnet.com": 0.65,
+    "wired.com": 0.65,
+    "theverge.com": 0.6,
+    "wikipedia.org": 0.7,
+    "dev.to": 0.5,
+    "medium.com": 0.5,
+    "news.ycombinator.com": 0.5,
+    "reddit.com": 0.35,
+    "quora.com": 0.15,
+    "youtube.com": 0.1,
+    "pinterest.com": 0.0,
+    "facebook.com": 0.0,
+}
@@ -0,0 +1,87 @@
+import copy
+import time
+from typing import Dict, Optional
+
+from techsage.utils.constants import DEADLINE_CONFIG
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the time budget of a run or of one of its phases is exhausted"""
+
+
+class Deadline:
+    """Time budget of a run, split into consecutive phases
+
+    Each phase ends at its cumulative share of the budget, so the time left by a phase finishing
+    early is available to the next ones.
+    """
+
+    def __init__(self, seconds: float, phases: Optional[Dict[str, float]] = None) -> None:
+        """Initialize the deadline
+
+        :param float seconds: The time budget of the run in seconds
+        :param Optional[Dict[str, float]] phases: The share of the budget of each phase in execution order,
+        default from the configuration
+        """
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.ends_at = self.started_at + seconds
+        phases = phases or DEADLINE_CONFIG["phases"]
+        total, elapsed_share = sum(phases.values()), 0.0
+        self.phase_ends: Dict[str, float] = {}
+        for name, share in phases.items():
+            elapsed_share += share / total
+            self.phase_ends[name] = self.started_at + seconds * elapsed_share
+        self.phase: Optional[str] = None
+
+    def start_phase(self, name: str) -> None:
+        """Enter a phase of the run
+
+        :param str name: The name of the phase
+        """
+        self.phase = name
+
+    def remaining(self, overall: bool = False) -> float:
+        """Get the time left
+
+        :param bool overall: If True ignore the end of the current phase, default False
+        :return float: The time left in seconds, 0 if exhausted
+        """
+        ends_at = self.ends_at if overall else self.phase_ends.get(self.phase, self.ends_at)
+        return max(0.0, min(ends_at, self.ends_at) - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """True if the current phase has no time left"""
+        return self.remaining() == 0
+
+    def check(self, overall: bool = False) -> None:
+        """Stop the current work if the budget is exhausted
+
+        :param bool overall: If True only stop when the whole run has no time left, default False
+        :raises DeadlineExceeded: If the current phase, or the run if overall, has no time left
+        """
+        if overall and self.remaining(overall=True) == 0:
+            raise DeadlineExceeded("Time budget of the run exhausted")
+        if not overall and self.expired:
+            raise DeadlineExceeded(f"Time budget of the {self.phase or 'run'} phase exhausted")
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """Bound a timeout by the time left
+
+        :param Optional[float] default: The timeout to use if enough time is left, default None
+        :raises DeadlineExceeded: If the current phase has no time left
+        :return float: The timeout in seconds
+        """
+        self.check()
+        remaining = self.remaining()
+        return remaining if default is None else min(default, remaining)
+
+    def overall(self) -> "Deadline":
+        """Get a view of the deadline bounded by the end of the run only, for work spanning several phases
+
+        :return Deadline: The deadline without phases
+        """
+        view = copy.copy(self)
+        view.phase_ends, view.phase = {}, None
+        return view
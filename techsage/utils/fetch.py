@@ -0,0 +1,190 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from techsage.utils.constants import FETCH_CONFIG
+from techsage.utils.deadline import Deadline, DeadlineExceeded
+
+
+class _HostState:
+    """Politeness state of a single host: a token bucket and an in-flight cap"""
+
+    def __init__(self, rate: float, burst: int, max_in_flight: int) -> None:
+        """Initialize the host state
+
+        :param float rate: The number of tokens refilled per second
+        :param int burst: The capacity of the token bucket
+        :param int max_in_flight: The maximum number of concurrent requests on the host
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    def acquire_token(self, deadline: Optional[Deadline] = None) -> None:
+        """Wait until a token is available in the bucket and consume it
+
+        :param Optional[Deadline] deadline: The time budget bounding the wait, default None
+        :raises DeadlineExceeded: If no token is available before the time budget runs out
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                wait = max(0.0, self.blocked_until - now)
+                if wait == 0 and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                if wait == 0:
+                    wait = (1 - self.tokens) / self.rate
+            if deadline and wait >= deadline.remaining():
+                raise DeadlineExceeded("Time budget exhausted waiting for the host rate limit")
+            time.sleep(wait)
+
+    def block_for(self, seconds: float) -> None:
+        """Prevent any new request on the host for a given duration
+
+        :param float seconds: The duration of the block
+        """
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class FetchScheduler:
+    """Central HTTP scheduler enforcing per-host politeness, timeouts and retries"""
+
+    def __init__(self, config: Optional[Dict] = None) -> None:
+        """Initialize the scheduler
+
+        :param Optional[Dict] config: The fetch configuration, default FETCH_CONFIG
+        """
+        self.config = {**FETCH_CONFIG, **(config or {})}
+        self._hosts: Dict[str, _HostState] = {}
+        self._hosts_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _host(self, url: str) -> _HostState:
+        """Get the politeness state of the host of an url
+
+        :param str url: The requested url
+        :return _HostState: The state of the host
+        """
+        host = urlsplit(url).netloc.lower()
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = _HostState(
+                    self.config["rate"], self.config["burst"], self.config["max_in_flight"]
+                )
+            return self._hosts[host]
+
+    def _session(self) -> requests.Session:
+        """Get the pooled session of the current thread
+
+        :return requests.Session: The session
+        """
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """Compute the delay before the next attempt
+
+        :param int attempt: The number of the failed attempt, starting at 0
+        :param Optional[requests.Response] response: The failed response if any, default None
+        :return float: The delay in seconds, the one asked by the Retry-After header of the response if any
+        """
+        retry_after = _parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.config["backoff_max"], self.config["backoff_base"] * 2**attempt)
+        return random.uniform(0, delay)  # full jitter
+
+    def request(self, method: str, url: str, deadline: Optional[Deadline] = None, **kwargs) -> requests.Response:
+        """Perform a polite request, retrying transient errors
+
+        :param str method: The HTTP method
+        :param str url: The url to request
+        :param Optional[Deadline] deadline: The time budget bounding the request and its retries, default None
+        :raises requests.RequestException: If the request still fails after all the retries
+        :raises DeadlineExceeded: If the time budget runs out before the request succeeds
+        :return requests.Response: The response
+        """
+        timeout = kwargs.pop("timeout", self.config["timeout"])
+        host = self._host(url)
+        max_retries = self.config["max_retries"]
+        for attempt in range(max_retries + 1):
+            host.acquire_token(deadline)
+            if not host.in_flight.acquire(timeout=deadline.remaining() if deadline else None):
+                raise DeadlineExceeded("Time budget exhausted waiting for a connection to the host")
+            response = None
+            try:
+                request_timeout = deadline.timeout(timeout) if deadline else timeout
+                response = self._session().request(method, url, timeout=request_timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == max_retries:
+                    raise
+            finally:
+                host.in_flight.release()
+            if response is not None:
+                if response.status_code not in self.config["retry_statuses"]:
+                    return response
+                if attempt == max_retries:
+                    response.raise_for_status()
+            delay = self._backoff(attempt, response)
+            if response is not None and response.status_code == 429:
+                host.block_for(delay)
+            if delay > self.config["backoff_max"]:  # only a Retry-After header asks for longer
+                response.raise_for_status()
+            if deadline and delay >= deadline.remaining():
+                deadline.check()
+                raise requests.Timeout(f"Not enough time left to retry {url}")
+            time.sleep(delay)
+        raise requests.RequestException(f"Retries exhausted for {url}")
+
+    def get(self, url: str, deadline: Optional[Deadline] = None, **kwargs) -> requests.Response:
+        """Perform a polite GET request
+
+        :param str url: The url to request
+        :param Optional[Deadline] deadline: The time budget bounding the request and its retries, default None
+        :return requests.Response: The response
+        """
+        return self.request("GET", url, deadline, **kwargs)
+
+    def post(self, url: str, deadline: Optional[Deadline] = None, **kwargs) -> requests.Response:
+        """Perform a polite POST request
+
+        :param str url: The url to request
+        :param Optional[Deadline] deadline: The time budget bounding the request and its retries, default None
+        :return requests.Response: The response
+        """
+        return self.request("POST", url, deadline, **kwargs)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header
+
+    :param Optional[str] value: The header value, either seconds or an HTTP date
+    :return Optional[float]: The delay in seconds, None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+fetch_scheduler = FetchScheduler()
@@ -0,0 +1,153 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from techsage.utils.constants import LLM_PRIORITIES, LLM_SCHEDULER_CONFIG
+from techsage.utils.deadline import Deadline
+
+
+class LLMSlot:
+    """A granted LLM request, flagged by the caller when the model server signals overload or when the request
+    was cut short by the time budget of the caller"""
+
+    def __init__(self) -> None:
+        """Initialize the slot"""
+        self.overloaded = False
+        self.cancelled = False
+
+
+class LLMScheduler:
+    """Process-wide scheduler of the LLM requests
+
+    Requests wait in a priority queue, interactive ones first, and at most `limit` of them run at the
+    same time. The limit follows an AIMD policy: it grows by one every `limit` successful requests and
+    shrinks multiplicatively on 429/5xx/timeouts or when the latency degrades.
+    """
+
+    def __init__(self, config: Optional[Dict] = None) -> None:
+        """Initialize the scheduler
+
+        :param Optional[Dict] config: The scheduler configuration, default LLM_SCHEDULER_CONFIG
+        """
+        self.config = {**LLM_SCHEDULER_CONFIG, **(config or {})}
+        self.limit = float(self.config["initial_limit"])
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._queue: list = []
+        self._counter = itertools.count()
+        self._usual_latency: Optional[float] = None
+        self._waits: deque = deque(maxlen=self.config["metrics_window"])
+        self._stats = {"requests": 0, "overloads": 0, "congestions": 0}
+
+    def _can_start(self, entry: list) -> bool:
+        """Check if a queued request can start
+
+        :param list entry: The queue entry of the request
+        :return bool: True if the request is the first in the queue and a slot is free
+        """
+        return self._queue[0] is entry and self.in_flight < int(self.limit)
+
+    def acquire(self, priority: str = "interactive", deadline: Optional[Deadline] = None) -> None:
+        """Wait for a free slot
+
+        :param str priority: The priority of the request, see LLM_PRIORITIES, default interactive
+        :param Optional[Deadline] deadline: The time budget bounding the wait, default None
+        :raises DeadlineExceeded: If the time budget runs out while waiting
+        """
+        entry = [LLM_PRIORITIES.get(priority, max(LLM_PRIORITIES.values())), next(self._counter)]
+        queued_at = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while not self._can_start(entry):
+                    if deadline:
+                        deadline.check()
+                    self._cond.wait(deadline.remaining() if deadline else None)
+            except BaseException:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            self._waits.append(time.monotonic() - queued_at)
+            self._cond.notify_all()
+
+    def release(self, latency: float, overloaded: bool = False, cancelled: bool = False) -> None:
+        """Free a slot and adapt the concurrency limit
+
+        :param float latency: The duration of the request in seconds
+        :param bool overloaded: True if the model server signaled overload, default False
+        :param bool cancelled: True if the request was cut short by the caller, its latency says nothing about the
+        model server and the limit is left unchanged, default False
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self._stats["requests"] += 1
+            if not cancelled:
+                self._adapt_limit(latency, overloaded)
+            self._cond.notify_all()
+
+    def _adapt_limit(self, latency: float, overloaded: bool) -> None:
+        """Adapt the concurrency limit to the outcome of a request, the lock must be held
+
+        :param float latency: The duration of the request in seconds
+        :param bool overloaded: True if the model server signaled overload
+        """
+        config = self.config
+        if overloaded:
+            self._stats["overloads"] += 1
+            self.limit = max(config["min_limit"], self.limit * config["backoff_factor"])
+        elif self._usual_latency and latency > config["latency_tolerance"] * self._usual_latency:
+            self._stats["congestions"] += 1
+            self.limit = max(config["min_limit"], self.limit * config["latency_factor"])
+        else:
+            self.limit = min(config["max_limit"], self.limit + 1 / self.limit)
+        if not overloaded and self._usual_latency is None:
+            self._usual_latency = latency
+        elif not overloaded:
+            smoothing = config["latency_smoothing"]
+            self._usual_latency = (1 - smoothing) * self._usual_latency + smoothing * latency
+
+    @contextmanager
+    def slot(self, priority: str = "interactive", deadline: Optional[Deadline] = None) -> Iterator[LLMSlot]:
+        """Run an LLM request in a slot
+
+        :param str priority: The priority of the request, see LLM_PRIORITIES, default interactive
+        :param Optional[Deadline] deadline: The time budget bounding the wait, default None
+        :yield LLMSlot: The slot, to flag if the request failed because of an overload or was cancelled
+        """
+        self.acquire(priority, deadline)
+        granted, started_at = LLMSlot(), time.monotonic()
+        try:
+            yield granted
+        except BaseException:
+            # only completed requests and overloads tell something about the model server
+            granted.cancelled = granted.cancelled or not granted.overloaded
+            raise
+        finally:
+            self.release(time.monotonic() - started_at, granted.overloaded, granted.cancelled)
+
+    def metrics(self) -> Dict:
+        """Get the metrics of the scheduler
+
+        :return Dict: The queue depth, requests in flight, concurrency limit, usual latency and wait times
+        """
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "queue_depth": len(self._queue),
+                "in_flight": self.in_flight,
+                "limit": int(self.limit),
+                "usual_latency": self._usual_latency,
+                "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                **self._stats,
+            }
+
+
+llm_scheduler = LLMScheduler()
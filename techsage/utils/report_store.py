@@ -0,0 +1,163 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from techsage.utils.constants import APP_FOLDER, REPORT_CONFIG
+
+
+def normalize_topic(topic: str) -> str:
+    """Normalize a topic so that the same topic written differently matches
+
+    :param str topic: The topic
+    :return str: The normalized topic
+    """
+    return " ".join(topic.lower().split())
+
+
+class ReportStore:
+    """Persistent store of the produced reports with a full-text index, backed by SQLite FTS5"""
+
+    def __init__(self, path: str = f"{APP_FOLDER}/reports.db") -> None:
+        """Initialize the store
+
+        :param str path: The path of the SQLite database, default in the app folder
+        """
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                topic_key TEXT NOT NULL,
+                incremental INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                sources TEXT NOT NULL,
+                report TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS reports_topic_key ON reports (topic_key, created_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+                topic, report, content='reports', content_rowid='id'
+            );
+            CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+                INSERT INTO reports_fts (rowid, topic, report) VALUES (new.id, new.topic, new.report);
+            END;
+            CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+                INSERT INTO reports_fts (reports_fts, rowid, topic, report)
+                VALUES ('delete', old.id, old.topic, old.report);
+            END;
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        """Convert a row into a report
+
+        :param sqlite3.Row row: The row
+        :return Dict: The report
+        """
+        report = dict(row)
+        if "sources" in report:
+            report["sources"] = json.loads(report["sources"])
+        report.pop("topic_key", None)
+        return report
+
+    def save(self, topic: str, report: str, sources: List[str], incremental: bool = False) -> int:
+        """Save a report
+
+        :param str topic: The topic of the report
+        :param str report: The report
+        :param List[str] sources: The urls of the sources used to write the report
+        :param bool incremental: True if the report is a digest of what changed since the previous one, default False
+        :return int: The id of the saved report
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO reports (topic, topic_key, incremental, created_at, sources, report) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (topic, normalize_topic(topic), int(incremental), time.time(), json.dumps(sources), report),
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def get(self, report_id: int) -> Optional[Dict]:
+        """Get a report
+
+        :param int report_id: The id of the report
+        :return Optional[Dict]: The report, None if it does not exist
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find_recent(self, topic: str, max_age: float = REPORT_CONFIG["max_age"]) -> Optional[Dict]:
+        """Find the latest complete report on a topic if it is recent enough
+
+        :param str topic: The topic
+        :param float max_age: The maximum age of the report in seconds, default from the configuration
+        :return Optional[Dict]: The report, None if there is no recent report on the topic
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM reports WHERE topic_key = ? AND incremental = 0 AND created_at >= ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (normalize_topic(topic), time.time() - max_age),
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def search(self, query: str, limit: int = REPORT_CONFIG["search_limit"]) -> List[Dict]:
+        """Search the reports matching all the words of a query, best match first
+
+        :param str query: The words to search for
+        :param int limit: The maximum number of reports to return, default from the configuration
+        :return List[Dict]: The matching reports without their content, with a snippet of the match
+        """
+        words = query.split()
+        if not words:
+            return self.latest(limit)
+        match = " ".join('"' + w.replace('"', '""') + '"' for w in words)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.id, r.topic, r.incremental, r.created_at, "
+                "snippet(reports_fts, 1, '**', '**', '...', 20) AS snippet "
+                "FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid "
+                "WHERE reports_fts MATCH ? ORDER BY bm25(reports_fts) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+    def latest(self, limit: int = REPORT_CONFIG["search_limit"]) -> List[Dict]:
+        """Get the latest reports
+
+        :param int limit: The maximum number of reports to return, default from the configuration
+        :return List[Dict]: The latest reports without their content, with the beginning of the report as snippet
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, topic, incremental, created_at, substr(report, 1, 120) AS snippet "
+                "FROM reports ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [self._to_dict(r) for r in rows]
+
+
+_store: Optional[ReportStore] = None
+_store_lock = threading.Lock()
+
+
+def get_report_store() -> ReportStore:
+    """Get the shared report store, created on first use
+
+    :return ReportStore: The store
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReportStore()
+        return _store
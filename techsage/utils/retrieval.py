@@ -0,0 +1,277 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from techsage.utils.constants import APP_FOLDER, RETRIEVAL_CONFIG
+from techsage.utils.deadline import Deadline, DeadlineExceeded
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class RetrievalIndex:
+    """Local retrieval index over scraped content, stored in SQLite and searched with NumPy"""
+
+    def __init__(self, path: str = f"{APP_FOLDER}/index.db", config: Optional[Dict] = None) -> None:
+        """Initialize the index
+
+        :param str path: The path of the SQLite database, default in the app folder
+        :param Optional[Dict] config: The retrieval configuration, default RETRIEVAL_CONFIG
+        """
+        self.config = {**RETRIEVAL_CONFIG, **(config or {})}
+        self._lock = threading.Lock()
+        self._cache: Dict[str, Tuple] = {}
+        self._embedding_disabled_until = 0.0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                tf BLOB NOT NULL,
+                embedding BLOB,
+                embedding_model TEXT,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_url ON chunks (url)")
+        self._conn.commit()
+
+    @property
+    def embedding_model(self) -> str:
+        """The name of the embedding model to use"""
+        return os.environ.get("EMBEDDING_MODEL_NAME", self.config["embedding_model"])
+
+    def _chunk(self, text: str) -> List[str]:
+        """Split a text into overlapping chunks of words
+
+        :param str text: The text to split
+        :return List[str]: The chunks
+        """
+        words = text.split()
+        size, overlap = self.config["chunk_size"], self.config["chunk_overlap"]
+        step = max(1, size - overlap)
+        return [" ".join(words[i : i + size]) for i in range(0, max(1, len(words) - overlap), step)]
+
+    def _term_frequencies(self, texts: List[str]) -> np.ndarray:
+        """Compute the log-scaled hashed term frequencies of texts
+
+        :param List[str] texts: The texts to vectorize
+        :return np.ndarray: A (len(texts), hash_dim) matrix
+        """
+        dim = self.config["hash_dim"]
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                matrix[i, zlib.crc32(token.encode()) % dim] += 1
+        return np.log1p(matrix, out=matrix)
+
+    def _embed(self, texts: List[str], deadline: Optional[Deadline] = None) -> Optional[np.ndarray]:
+        """Embed texts with the local embedding model
+
+        :param List[str] texts: The texts to embed
+        :param Optional[Deadline] deadline: The time budget bounding the request, default None
+        :return Optional[np.ndarray]: The embeddings, None if the local model is not available or not in time
+        """
+        if os.environ.get("LOCAL") != "true" or time.monotonic() < self._embedding_disabled_until:
+            return None
+        timeout = self.config["embedding_timeout"]
+        try:
+            request_timeout = deadline.timeout(timeout) if deadline else timeout
+            resp = requests.post(
+                f"{os.environ['OPENAI_API_BASE'].rstrip('/')}/embeddings",
+                json={"model": self.embedding_model, "input": texts},
+                timeout=request_timeout,
+            )
+            resp.raise_for_status()
+            data = sorted(resp.json()["data"], key=lambda x: x["index"])
+            return np.array([x["embedding"] for x in data], dtype=np.float32)
+        except DeadlineExceeded:
+            return None
+        except requests.Timeout:
+            # a timeout shortened by the time budget does not mean the model is unavailable
+            if request_timeout >= timeout:
+                self._embedding_disabled_until = time.monotonic() + self.config["embedding_retry_delay"]
+            return None
+        except Exception:
+            self._embedding_disabled_until = time.monotonic() + self.config["embedding_retry_delay"]
+            return None
+
+    def add(self, url: str, text: str, deadline: Optional[Deadline] = None) -> int:
+        """Index the content of a page, replacing any previous version of it
+
+        :param str url: The url of the page
+        :param str text: The text content of the page
+        :param Optional[Deadline] deadline: The time budget bounding the embedding of the page, default None
+        :return int: The number of indexed chunks
+        """
+        chunks = [c for c in self._chunk(text) if c.strip() != ""]
+        if not chunks:
+            return 0
+        tfs = self._term_frequencies(chunks)
+        embeddings = self._embed(chunks, deadline)
+        model = self.embedding_model if embeddings is not None else None
+        now = time.time()
+        rows = [
+            (url, i, chunk, tfs[i].tobytes(), None if embeddings is None else embeddings[i].tobytes(), model, now)
+            for i, chunk in enumerate(chunks)
+        ]
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+            self._conn.executemany(
+                "INSERT INTO chunks (url, position, text, tf, embedding, embedding_model, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._cache.clear()
+        return len(chunks)
+
+    def get_text(self, url: str) -> Optional[str]:
+        """Rebuild the indexed content of a page from its chunks
+
+        :param str url: The url of the page
+        :return Optional[str]: The text content of the page, None if the page is not indexed
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT text FROM chunks WHERE url = ? ORDER BY position", (url,)).fetchall()
+        if not rows:
+            return None
+        overlap = self.config["chunk_overlap"]
+        words = rows[0][0].split()
+        for (text,) in rows[1:]:
+            words.extend(text.split()[overlap:])
+        return " ".join(words)
+
+    def _load(self, column: str, model: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Load the ids and vectors of a column, cached until the index changes
+
+        :param str column: Either 'tf' or 'embedding'
+        :param Optional[str] model: The embedding model the vectors must come from, default None
+        :return Tuple[np.ndarray, np.ndarray]: The chunk ids in ascending order and the matrix of vectors
+        """
+        key = f"{column}:{model}"
+        with self._lock:
+            if key not in self._cache:
+                query = f"SELECT id, {column} FROM chunks WHERE {column} IS NOT NULL"
+                params: Tuple = ()
+                if model is not None:
+                    query += " AND embedding_model = ?"
+                    params = (model,)
+                query += " ORDER BY id"
+                rows = self._conn.execute(query, params).fetchall()
+                ids = np.array([r[0] for r in rows], dtype=np.int64)
+                vectors = [np.frombuffer(r[1], dtype=np.float32) for r in rows]
+                matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+                self._cache[key] = (ids, matrix)
+            return self._cache[key]
+
+    def _rank_tfidf(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Score the chunks against a query with TF-IDF cosine similarity
+
+        :param str query: The query
+        :return Tuple[np.ndarray, np.ndarray]: The chunk ids and their scores
+        """
+        ids, tfs = self._load("tf")
+        if len(ids) == 0:
+            return ids, np.zeros(0)
+        df = np.count_nonzero(tfs, axis=0)
+        idf = np.log((1 + len(ids)) / (1 + df)) + 1
+        return ids, _cosine(tfs * idf, self._term_frequencies([query])[0] * idf)
+
+    def _rank_embedding(
+        self, query: str, deadline: Optional[Deadline] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Score the chunks against a query with embedding cosine similarity
+
+        :param str query: The query
+        :param Optional[Deadline] deadline: The time budget bounding the embedding of the query, default None
+        :return Optional[Tuple[np.ndarray, np.ndarray]]: The chunk ids and their scores, None if not available
+        """
+        ids, embeddings = self._load("embedding", self.embedding_model)
+        if len(ids) == 0:
+            return None
+        query_embedding = self._embed([query], deadline)
+        if query_embedding is None:
+            return None
+        return ids, _cosine(embeddings, query_embedding[0])
+
+    def search(self, query: str, top_k: Optional[int] = None, deadline: Optional[Deadline] = None) -> List[Dict]:
+        """Search the most relevant chunks for a query
+
+        :param str query: The query
+        :param Optional[int] top_k: The number of chunks to return, default from the configuration
+        :param Optional[Deadline] deadline: The time budget bounding the embedding of the query, default None
+        :return List[Dict]: The chunks with their url, text and fused score, best first
+        """
+        top_k = top_k or self.config["top_k"]
+        fusion_k = self.config["rank_fusion_k"]
+        ids, tfidf_scores = self._rank_tfidf(query)
+        scores = _reciprocal_ranks(tfidf_scores, fusion_k)
+        embedded = self._rank_embedding(query, deadline)
+        if embedded is not None:
+            # the TF-IDF and embedding similarities are not on the same scale, so their rankings are fused rather
+            # than their scores; the chunks not embedded with the current model (indexed while the model was
+            # unavailable or in remote mode) only get their TF-IDF rank
+            embedded_ids, embedded_scores = embedded
+            scores[np.searchsorted(ids, embedded_ids)] += _reciprocal_ranks(embedded_scores, fusion_k)
+        best = [i for i in np.argsort(-scores)[:top_k] if scores[i] > 0]
+        if not best:
+            return []
+        selected = {int(ids[i]): float(scores[i]) for i in best}
+        placeholders = ",".join("?" * len(selected))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, url, text FROM chunks WHERE id IN ({placeholders})", list(selected)
+            ).fetchall()
+        results = [{"url": url, "text": text, "score": selected[id_]} for id_, url, text in rows]
+        return sorted(results, key=lambda x: -x["score"])
+
+
+def _cosine(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
+    """Compute the cosine similarity between each row of a matrix and a vector
+
+    :param np.ndarray matrix: The matrix
+    :param np.ndarray vector: The vector
+    :return np.ndarray: The similarities
+    """
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+    return np.divide(matrix @ vector, norms, out=np.zeros(len(matrix)), where=norms > 0)
+
+
+def _reciprocal_ranks(scores: np.ndarray, k: int) -> np.ndarray:
+    """Turn similarities into reciprocal rank fusion scores
+
+    :param np.ndarray scores: The similarities
+    :param int k: The damping of the ranks
+    :return np.ndarray: 1 / (k + rank) for each positive similarity, 0 for the others
+    """
+    ranks = np.empty(len(scores))
+    ranks[np.argsort(-scores, kind="stable")] = np.arange(1, len(scores) + 1)
+    return np.where(scores > 0, 1 / (k + ranks), 0.0)
+
+
+_index: Optional[RetrievalIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_retrieval_index() -> RetrievalIndex:
+    """Get the shared retrieval index, created on first use
+
+    :return RetrievalIndex: The index
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RetrievalIndex()
+        return _index
@@ -0,0 +1,70 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from techsage.utils.constants import APP_FOLDER, SEEN_URL_CONFIG
+
+
+class SeenUrlIndex:
+    """Persistent set of the fetched urls, stored in a SQLite table holding the fetch time of each url and shared
+    by all the processes of the app"""
+
+    def __init__(self, path: str = f"{APP_FOLDER}/seen_urls.db", config: Optional[Dict] = None) -> None:
+        """Initialize the index
+
+        :param str path: The path of the SQLite database, default in the app folder
+        :param Optional[Dict] config: The seen url configuration, default SEEN_URL_CONFIG
+        """
+        self.config = {**SEEN_URL_CONFIG, **(config or {})}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (url TEXT PRIMARY KEY, fetched_at REAL NOT NULL)")
+        self._conn.execute("DROP TABLE IF EXISTS bloom")  # bloom filter of the previous versions
+        self._conn.commit()
+
+    def fetched_at(self, url: str) -> Optional[float]:
+        """Get the last time an url was fetched
+
+        :param str url: The canonical url
+        :return Optional[float]: The timestamp of the last fetch, None if never fetched
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT fetched_at FROM seen WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, url: str) -> bool:
+        """Check if an url was fetched recently enough to skip fetching it again
+
+        :param str url: The canonical url
+        :return bool: True if the url was fetched during the configured ttl
+        """
+        fetched_at = self.fetched_at(url)
+        return fetched_at is not None and time.time() - fetched_at < self.config["ttl"]
+
+    def add(self, url: str) -> None:
+        """Record that an url was just fetched
+
+        :param str url: The canonical url
+        """
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO seen (url, fetched_at) VALUES (?, ?)", (url, time.time()))
+            self._conn.commit()
+
+
+_index: Optional[SeenUrlIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_seen_url_index() -> SeenUrlIndex:
+    """Get the shared seen url index, created on first use
+
+    :return SeenUrlIndex: The index
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SeenUrlIndex()
+        return _index
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Dict, Optional
+
+from techsage.utils.constants import APP_FOLDER
+
+
+class TopicState:
+    """State persisted between the runs on a same topic, used by the incremental mode"""
+
+    def __init__(
+        self, topic: str, pages: Optional[Dict[str, str]] = None, report: Optional[str] = None, updated_at: float = 0
+    ) -> None:
+        """Initialize the topic state
+
+        :param str topic: The topic
+        :param Optional[Dict[str, str]] pages: The content hash of each page seen so far by url, default None
+        :param Optional[str] report: The report produced by the last run, default None
+        :param float updated_at: The timestamp of the last run, default 0
+        """
+        self.topic = topic
+        self.pages = pages or {}
+        self.report = report
+        self.updated_at = updated_at
+
+    @staticmethod
+    def path(topic: str) -> str:
+        """Get the path of the state file of a topic
+
+        :param str topic: The topic
+        :return str: The path of the state file
+        """
+        normalized = " ".join(topic.lower().split())
+        slug = re.sub(r"[^a-z0-9]+", "-", normalized).strip("-")[:50]
+        digest = hashlib.sha1(normalized.encode()).hexdigest()[:10]
+        return f"{APP_FOLDER}/topics/{slug}-{digest}.json"
+
+    @classmethod
+    def load(cls, topic: str) -> "TopicState":
+        """Load the state of a topic, empty if the topic was never processed
+
+        :param str topic: The topic
+        :return TopicState: The state of the topic
+        """
+        try:
+            with open(cls.path(topic), "r") as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return cls(topic)
+
+    def update(self, content_hashes: Dict[str, str], report: str) -> None:
+        """Merge the result of a new run into the state
+
+        :param Dict[str, str] content_hashes: The content hash of the pages scraped during the run by url
+        :param str report: The report produced by the run
+        """
+        self.pages.update(content_hashes)
+        self.report = report
+        self.updated_at = time.time()
+
+    def save(self) -> None:
+        """Save the state of the topic"""
+        path = self.path(self.topic)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(
+                {"topic": self.topic, "pages": self.pages, "report": self.report, "updated_at": self.updated_at}, f
+            )
+
+
+def content_hash(text: str) -> str:
+    """Compute the hash of a page content
+
+    :param str text: The text content of the page
+    :return str: The hash
+    """
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
@@ -0,0 +1,100 @@
+import re
+from typing import List, Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "ref_src",
+    "ref_url",
+    "referrer",
+    "spm",
+    "amp",
+    "outputtype",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_", "vero_")
+AMP_CACHE_PATTERN = re.compile(r"^/(?:c/)?(?:s/)?(?P<url>[^/]+\.[^/]+/.*)$")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+URL_PATTERN = re.compile(r"https?://[^\s\"'<>()\[\]{}]+")
+SEARCH_ENGINE_PATTERN = re.compile(r"(^|\.)(google|gstatic|googleusercontent|duckduckgo|bing)\.[a-z.]+$")
+
+
+def clean_url(url: str) -> str:
+    """Remove the quotes, spaces and brackets an agent may add around an url
+
+    :param str url: The raw url
+    :return str: The cleaned url
+    """
+    url = url.strip().strip("\"'<>` ")
+    if "://" not in url:
+        url = f"https://{url}"
+    return url
+
+
+def canonicalize_url(url: str) -> str:
+    """Compute the canonical form of an url, shared by all the variants of a same page
+
+    The scheme is forced to https, the host is lowercased without 'www.' nor default port, AMP variants
+    are mapped to the original page, tracking parameters and fragments are removed, the remaining query
+    parameters are sorted and trailing slashes or index pages are dropped.
+
+    :param str url: The url to canonicalize
+    :return str: The canonical url
+    """
+    parts = urlsplit(clean_url(url))
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    path = parts.path or "/"
+
+    if host.endswith(".cdn.ampproject.org") or (host.startswith("google.") or ".google." in host) and path.startswith(
+        "/amp/"
+    ):
+        match = AMP_CACHE_PATTERN.match(path[4:] if path.startswith("/amp/") else path)
+        if match:
+            return canonicalize_url(f"https://{unquote(match.group('url'))}")
+
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if host.count(".") >= 2:  # keep registrable domains such as amp.dev whole
+        host = re.sub(r"^(www\d*|amp|m)\.", "", host)
+
+    path = re.sub(r"/{2,}", "/", path)
+    path = re.sub(r"(/amp)+/?$", "/", path)
+    path = re.sub(r"/(index\.(html?|php))$", "/", path)
+    path = path.rstrip("/") or "/"
+
+    query = [
+        (k, v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit(("https", host, path, urlencode(sorted(query)), ""))
+
+
+def extract_urls(text: str, limit: Optional[int] = None) -> List[str]:
+    """Extract the result urls of a search output, without duplicates nor search engine links
+
+    :param str text: The search output
+    :param Optional[int] limit: The maximum number of urls to return, default None for all
+    :return List[str]: The urls in order of appearance
+    """
+    urls, seen = [], set()
+    for match in URL_PATTERN.findall(text):
+        url = match.rstrip(".,;:")
+        host = (urlsplit(url).hostname or "").lower()
+        canonical = canonicalize_url(url)
+        if SEARCH_ENGINE_PATTERN.search(host) or canonical in seen:
+            continue
+        seen.add(canonical)
+        urls.append(url)
+        if limit and len(urls) >= limit:
+            break
+    return urls